@@ -0,0 +1,143 @@
+"""
+Shared plumbing for the benchmark scripts in this directory.
+
+Each benchmark runs against a throw-away copy of the configured PostgreSQL
+database (the same one `manage.py test` would create), seeds it with synthetic
+listings using a single INSERT ... SELECT generate_series() statement, and
+reports EXPLAIN ANALYZE plans plus median wall-clock latencies.
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mela_rent.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+
+LOCATIONS = [
+    'Bole', 'Piassa', 'Sarbet', 'Kazanchis', 'Megenagna', 'CMC', 'Gerji',
+    'Ayat', 'Summit', 'Lebu', 'Old Airport', 'Mexico', 'Arat Kilo', 'Saris',
+]
+
+# SQL expression per Property column, evaluated once per row of generate_series(1, N) AS g.
+# Benchmarks may override individual columns to shape the data they need.
+PROPERTY_COLUMNS = {
+    'owner_id': '(%(owner_ids)s)[1 + g %% %(owner_count)s]',
+    'title': "'Listing ' || g",
+    'description': "repeat('Spacious family home close to shops and transport. ', 8)",
+    'house_type': "(ARRAY['Condo', 'Villa', 'Apartment', 'House'])[1 + g % 4]",
+    'location': '(%(locations)s)[1 + g %% %(location_count)s]',
+    'price': 'round((500 + random() * 49500)::numeric, 2)',
+    'floor_number': 'NULL',
+    'bedrooms': '1 + g % 6',
+    'bathrooms': '1 + g % 3',
+    'max_guests': '1 + g % 10',
+    'amenities': "(ARRAY['WiFi', 'WiFi, Parking', 'Pool, Gym', 'WiFi, Pool, Gym', 'Parking'])[1 + g % 5]",
+    'amenity_tags': "(ARRAY['{wifi}', '{wifi,parking}', '{pool,gym}', '{wifi,pool,gym}', '{parking}'])[1 + g % 5]::varchar[]",
+    'latitude': '8.9 + random() * 0.2',
+    'longitude': '38.7 + random() * 0.2',
+    'image': "''",
+    'image_thumbnail': "''",
+    'image_medium': "''",
+    'image_webp': "''",
+    'is_available': 'true',
+    # 60% paid, paid_until spread over -20..+40 days; is_listed must agree with both,
+    # so the three are derived from g rather than from independent random() calls.
+    'is_paid': '(g::bigint * 104729 % 10) < 6',
+    'paid_until': "now() + ((g::bigint * 7919 % 6000) / 100.0 - 20) * interval '1 day'",
+    'is_listed': '(g::bigint * 104729 % 10) < 6 AND (g::bigint * 7919 % 6000) >= 2000',
+    'is_deleted': 'random() < 0.05',
+    'deleted_at': 'NULL',
+    'created_at': "now() - random() * interval '365 days'",
+    'updated_at': 'now()',
+    # Long-tailed: most listings have no favorites, a few have many.
+    'favorite_count': '(g::bigint * 2654435761 % 1000) / 100 * (g % 3)',
+    'inquiry_count': 'g % 4',
+}
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Create (and afterwards destroy) a scratch test database to benchmark against."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def seed_properties(count, owners=50, **columns):
+    """Insert `count` synthetic properties owned by `owners` users; returns the owners."""
+    User = get_user_model()
+    users = User.objects.bulk_create([
+        User(username=f'bench_owner_{i}', role='OWNER') for i in range(owners)
+    ])
+    context = {
+        'owner_ids': 'ARRAY[%s]::bigint[]' % ','.join(str(u.pk) for u in users),
+        'owner_count': owners,
+        'locations': 'ARRAY[%s]' % ','.join("'%s'" % name for name in LOCATIONS),
+        'location_count': len(LOCATIONS),
+    }
+    spec = {**PROPERTY_COLUMNS, **columns}
+    names = ', '.join(spec)
+    values = ', '.join(
+        (expr % context) if '%(' in expr else expr for expr in spec.values()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO properties_property ({names}) '
+            f'SELECT {values} FROM generate_series(1, {int(count)}) AS g'
+        )
+        cursor.execute('ANALYZE properties_property')
+    return users
+
+
+def explain(queryset):
+    """Return the EXPLAIN (ANALYZE, BUFFERS) plan for a queryset as text."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+def median_ms(func, repeat=7):
+    """Run `func` `repeat` times (after one warm-up call) and return the median in ms."""
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+@contextmanager
+def without_indexes(*names):
+    """Temporarily drop the named indexes; they are restored when the block exits."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+        yield
+        transaction.set_rollback(True)
+
+
+def report(title, queryset, show_plan=True):
+    """Print the median latency of evaluating `queryset` and, optionally, its plan."""
+    # .all() hands back a fresh clone each time, so the result cache never short-circuits a run.
+    print(f'--- {title}: {median_ms(lambda: list(queryset.all())):.2f} ms')
+    if show_plan:
+        print(explain(queryset))
+        print()
@@ -0,0 +1,69 @@
+"""
+Amenity filtering: substring scans on the amenities text vs. GIN containment
+on amenity_tags.
+
+Rows get a pseudo-random subset of a 16-amenity vocabulary, so "wifi AND
+parking" matches roughly a quarter of the table and rarer combinations far
+less. Each query fetches one page of results.
+
+    python benchmarks/bench_amenities.py --rows 400000
+"""
+import argparse
+
+from _harness import benchmark_database, report, seed_properties
+
+from properties.models import Property
+
+VOCABULARY = [
+    'WiFi', 'Parking', 'Pool', 'Gym', 'Generator', 'Water Tank', 'Garden', 'Balcony',
+    'Elevator', 'Security', 'Furnished', 'Laundry', 'Air Conditioning', 'Heating', 'CCTV', 'Pet Friendly',
+]
+PAGE = 10
+
+# Bit i of a per-row hash decides whether amenity i is present.
+_SUBSET = (
+    "ARRAY(SELECT {item} FROM unnest(ARRAY[%s]) WITH ORDINALITY AS v(a, i) "
+    "WHERE (hashint4(g) >> (i::int - 1)) & 1 = 1)"
+) % ', '.join("'%s'" % name for name in VOCABULARY)
+
+COLUMNS = {
+    'amenities': "array_to_string(%s, ', ')" % _SUBSET.format(item='a'),
+    'amenity_tags': '%s::varchar[]' % _SUBSET.format(item='lower(a)'),
+}
+
+CASES = [
+    ('wifi AND parking', ['wifi', 'parking']),
+    ('pool AND gym AND cctv AND pet friendly', ['pool', 'gym', 'cctv', 'pet friendly']),
+]
+
+
+def icontains_all(tags):
+    queryset = Property.objects.active()
+    for tag in tags:
+        queryset = queryset.filter(amenities__icontains=tag)
+    return queryset
+
+
+def run(show_plans):
+    seed_properties(ARGS.rows, **COLUMNS)
+    print(f'== {ARGS.rows} rows, page size {PAGE}\n')
+    for label, tags in CASES:
+        report(f'icontains   | {label}', icontains_all(tags).order_by('-created_at')[:PAGE], show_plans)
+        report(f'amenities_all | {label}',
+               Property.objects.active().filter(amenity_tags__contains=tags).order_by('-created_at')[:PAGE],
+               show_plans)
+        report(f'icontains   | count {label}', icontains_all(tags).values('pk'), show_plans)
+        report(f'amenities_all | count {label}',
+               Property.objects.active().filter(amenity_tags__contains=tags).values('pk'), show_plans)
+    report('amenities_any | cctv OR pet friendly',
+           Property.objects.active().filter(amenity_tags__overlap=['cctv', 'pet friendly']).values('pk'),
+           show_plans)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=400_000)
+    parser.add_argument('--no-plans', action='store_true', help='Only print latencies.')
+    ARGS = parser.parse_args()
+    with benchmark_database():
+        run(show_plans=not ARGS.no_plans)
@@ -0,0 +1,51 @@
+"""
+Location typeahead: the `?location=` icontains query each keystroke used to
+send vs. a lookup in the in-process prefix index (properties/autocomplete.py).
+
+Rows get one of --locations distinct synthetic locations ("Bole 17 Kebele"
+style, several words each), so short prefixes match a large share of them.
+The index is built once from the seeded table; lookups never query.
+
+    python benchmarks/bench_autocomplete.py --rows 400000 --locations 20000
+"""
+import argparse
+
+from _harness import benchmark_database, median_ms, report, seed_properties
+
+from django.db.models import Count
+
+from properties.autocomplete import rebuild_location_index
+from properties.models import Property
+
+WORDS = ['Bole', 'Kazanchis', 'Gerji', 'Ayat', 'Summit', 'Lebu', 'Saris', 'Mexico', 'Piassa', 'Sarbet']
+PREFIXES = ['b', 'bo', 'bole 1', 'kaz', 'kebele 12']
+
+
+def run(show_plans):
+    locations = "(ARRAY[%s])[1 + g %% %d] || ' ' || (g %% %d) || ' Kebele'" % (
+        ', '.join("'%s'" % word for word in WORDS), len(WORDS), ARGS.locations // len(WORDS),
+    )
+    seed_properties(ARGS.rows, location=locations)
+    print(f'== {ARGS.rows} rows, ~{ARGS.locations} distinct locations\n')
+    print(f'--- build index: {median_ms(rebuild_location_index, repeat=3):.2f} ms\n')
+    index = rebuild_location_index()
+    for prefix in PREFIXES:
+        report(
+            f'icontains | {prefix!r}',
+            Property.objects.visible().filter(location__icontains=prefix)
+            .values('location').annotate(listings=Count('id')).order_by('-listings')[:5],
+            show_plans,
+        )
+        # Microseconds are lost in median_ms's millisecond rounding; time 1000 lookups instead.
+        elapsed = median_ms(lambda: [index.lookup(prefix, 5) for _ in range(1000)])
+        print(f'--- index     | {prefix!r}: {elapsed:.2f} us per lookup\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=400_000)
+    parser.add_argument('--locations', type=int, default=20_000)
+    parser.add_argument('--no-plans', action='store_true', help='Only print latencies.')
+    ARGS = parser.parse_args()
+    with benchmark_database():
+        run(show_plans=not ARGS.no_plans)
@@ -0,0 +1,68 @@
+"""
+Radius and bounding-box search over latitude/longitude without PostGIS.
+
+Seeds synthetic listings spread over greater Addis Ababa (~0.4 x 0.4 degrees)
+and compares, for a 2 km radius and a small map viewport:
+- "naive": the exact haversine test on every row (no bounding-box prefilter),
+- "before": bounding-box prefilter + haversine, but without property_lat_lng_idx,
+- "after": the ?near=&radius_km= / ?bbox= code path with the index.
+
+    python benchmarks/bench_geo.py --rows 1000000
+"""
+import argparse
+
+from _harness import benchmark_database, report, seed_properties, without_indexes
+
+from properties.geo import bounding_box, distance_expression
+from properties.models import Property
+
+CENTER = (9.0108, 38.7613)
+RADIUS_KM = 2.0
+VIEWPORT = (38.74, 9.00, 38.76, 9.02)  # min_lng, min_lat, max_lng, max_lat
+PAGE = 10
+
+
+def naive_radius():
+    return Property.objects.active().annotate(
+        distance=distance_expression(*CENTER)
+    ).filter(distance__lte=RADIUS_KM).order_by('distance', 'id')
+
+
+def prefiltered_radius():
+    min_lat, max_lat, min_lng, max_lng = bounding_box(*CENTER, RADIUS_KM)
+    return Property.objects.active().filter(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lng, longitude__lte=max_lng,
+    ).annotate(distance=distance_expression(*CENTER)).filter(distance__lte=RADIUS_KM).order_by('distance', 'id')
+
+
+def viewport():
+    min_lng, min_lat, max_lng, max_lat = VIEWPORT
+    return Property.objects.active().filter(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lng, longitude__lte=max_lng,
+    )
+
+
+def run(show_plans):
+    seed_properties(
+        ARGS.rows,
+        latitude='round((8.8 + random() * 0.4)::numeric, 6)',
+        longitude='round((38.55 + random() * 0.4)::numeric, 6)',
+    )
+    print(f'== {ARGS.rows} rows, {RADIUS_KM} km radius, page size {PAGE}\n')
+    report('naive  | radius page', naive_radius()[:PAGE], show_plans)
+    with without_indexes('property_lat_lng_idx'):
+        report('before | radius page', prefiltered_radius()[:PAGE], show_plans)
+        report('before | viewport ids', viewport().values('pk'), show_plans)
+    report('after  | radius page', prefiltered_radius()[:PAGE], show_plans)
+    report('after  | viewport ids', viewport().values('pk'), show_plans)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--no-plans', action='store_true', help='Only print latencies.')
+    ARGS = parser.parse_args()
+    with benchmark_database():
+        run(show_plans=not ARGS.no_plans)
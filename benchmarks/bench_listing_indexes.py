@@ -0,0 +1,68 @@
+"""
+Listing query plans and latencies before/after the visibility indexes.
+
+"Before" drops the partial listing indexes; "after" keeps them.
+For the authenticated owner branch a third variant, id IN (visible UNION mine),
+is measured as well: it is the obvious rewrite of the OR, but it has to
+materialise every visible id before it can sort, so visible_to() keeps the OR.
+
+    python benchmarks/bench_listing_indexes.py --rows 400000
+"""
+import argparse
+
+from _harness import benchmark_database, report, seed_properties, without_indexes
+
+from django.conf import settings
+
+from properties.models import Property
+
+LISTING_INDEXES = (
+    'property_listed_until_idx',
+    'property_listed_price_idx',
+    'property_listed_created_idx',
+    'property_active_price_idx',
+    'property_active_created_idx',
+)
+PAGE = 10
+
+
+def union_visible_to(user):
+    """The UNION formulation of visible_to(), kept here for comparison."""
+    visible = Property.objects.visible().values('pk')
+    mine = Property.objects.active().filter(owner=user).values('pk')
+    return Property.objects.filter(pk__in=visible.union(mine))
+
+
+def run(show_plans):
+    owner = seed_properties(ARGS.rows)[0]
+    cases = [
+        ('anonymous, -created_at', lambda: Property.objects.visible().order_by('-created_at')),
+        ('anonymous, price', lambda: Property.objects.visible().order_by('price')),
+        ('anonymous, -price', lambda: Property.objects.visible().order_by('-price')),
+    ]
+    print(f'== {ARGS.rows} rows, page size {PAGE}\n')
+    for label, build in cases:
+        with without_indexes(*LISTING_INDEXES):
+            queryset = build()[:PAGE]
+            report(f'before | {label}', queryset, show_plans)
+        queryset = build()[:PAGE]
+        report(f'after  | {label}', queryset, show_plans)
+
+    for ordering in ('-created_at', 'price'):
+        with without_indexes(*LISTING_INDEXES):
+            queryset = Property.objects.visible_to(owner).order_by(ordering)[:PAGE]
+            report(f'before | owner, {ordering}', queryset, show_plans)
+        queryset = Property.objects.visible_to(owner).order_by(ordering)[:PAGE]
+        report(f'after  | owner, {ordering}', queryset, show_plans)
+        queryset = union_visible_to(owner).order_by(ordering)[:PAGE]
+        report(f'union  | owner, {ordering}', queryset, show_plans)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=400_000)
+    parser.add_argument('--no-plans', action='store_true', help='Only print latencies.')
+    ARGS = parser.parse_args()
+    settings.REQUIRE_LISTING_PAYMENT = True
+    with benchmark_database():
+        run(show_plans=not ARGS.no_plans)
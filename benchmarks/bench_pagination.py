@@ -0,0 +1,55 @@
+"""
+Page-number (COUNT + OFFSET) vs. keyset pagination at increasing depth.
+
+Both variants read one page of the anonymous listing ordered by price. The
+keyset variant seeks from the last row of the previous page exactly like
+PropertyCursorPagination does.
+
+    python benchmarks/bench_pagination.py --rows 400000
+"""
+import argparse
+
+from _harness import benchmark_database, median_ms, seed_properties
+
+from django.conf import settings
+
+from properties.models import Property
+from properties.pagination import PropertyCursorPagination
+
+PAGE = 10
+DEPTHS = (1, 100, 1_000, 10_000)
+
+
+def run():
+    seed_properties(ARGS.rows)
+    visible = Property.objects.visible().order_by('price', 'id')
+    paginator = PropertyCursorPagination()
+    paginator.key_field = 'price'
+    print(f'== {ARGS.rows} rows, page size {PAGE}\n')
+    print(f'{"page":>8} {"COUNT+OFFSET ms":>16} {"keyset ms":>10}')
+    for depth in DEPTHS:
+        offset = (depth - 1) * PAGE
+        if offset >= visible.count():
+            break
+        last = visible[offset - 1] if offset else None
+
+        def offset_page():
+            visible.all().count()
+            list(visible.all()[offset:offset + PAGE])
+
+        def keyset_page():
+            queryset = visible.all()
+            if last is not None:
+                queryset = queryset.filter(paginator.seek_condition(last.price, last.pk, descending=False))
+            list(queryset[:PAGE + 1])
+
+        print(f'{depth:>8} {median_ms(offset_page):>16.2f} {median_ms(keyset_page):>10.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=400_000)
+    ARGS = parser.parse_args()
+    settings.REQUIRE_LISTING_PAYMENT = True
+    with benchmark_database():
+        run()
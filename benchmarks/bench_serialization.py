@@ -0,0 +1,44 @@
+"""
+Rows per second: PropertySerializer over model instances vs. ValuesSerializer
+over .values() rows, for the compact list representation and the full one.
+
+Rows are fetched once up front, so only serialization is timed.
+
+    python benchmarks/bench_serialization.py --rows 100 --repeat 50
+"""
+import argparse
+
+from _harness import benchmark_database, median_ms, seed_properties
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from properties.fast_serializers import ValuesSerializer
+from properties.models import Property
+from properties.serializers import PropertyListSerializer, PropertySerializer
+
+
+def run():
+    seed_properties(ARGS.rows, image="'properties/images/listing-' || g || '.jpg'")
+    request = Request(APIRequestFactory().get('/api/properties/'))
+    context = {'request': request}
+    print(f'== {ARGS.rows} rows per page\n')
+    print(f'{"representation":>16} {"serializer rows/s":>18} {"values rows/s":>14} {"speed-up":>9}')
+    for label, serializer_class in (('list', PropertyListSerializer), ('full', PropertySerializer)):
+        rows = ValuesSerializer(serializer_class(context=context))
+        instances = list(Property.objects.order_by('id')[:ARGS.rows])
+        values = list(Property.objects.order_by('id').values(*rows.columns)[:ARGS.rows])
+
+        before = median_ms(lambda: serializer_class(instances, many=True, context=context).data, ARGS.repeat)
+        after = median_ms(lambda: rows.serialize(values), ARGS.repeat)
+        print(f'{label:>16} {len(instances) / before * 1000:>18,.0f} '
+              f'{len(values) / after * 1000:>14,.0f} {before / after:>8.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    ARGS = parser.parse_args()
+    with benchmark_database():
+        run()
@@ -2,6 +2,7 @@ from rest_framework import viewsets, mixins, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 
@@ -24,7 +25,15 @@ class FavoriteViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.Des
         return FavoriteSerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # The favorite and its counter commit together, so favorite_count never drifts on errors.
+        with transaction.atomic():
+            favorite = serializer.save(user=self.request.user)
+            Property.objects.filter(pk=favorite.property_id).add_to_counter('favorite_count', 1)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Property.objects.filter(pk=instance.property_id).add_to_counter('favorite_count', -1)
 
 
 class MockPaymentView(APIView):
@@ -48,7 +57,8 @@ class MockPaymentView(APIView):
                 status='SUCCESS'
             )
             
-            # Upgrade the property's validity
+            # Upgrade the property's validity; save() sets is_listed from these,
+            # and the expire_listings sweeper clears it once paid_until passes.
             prop.is_paid = True
             prop.paid_until = timezone.now() + timedelta(days=expiry_days)
             prop.save()
@@ -57,6 +67,7 @@ class MockPaymentView(APIView):
                 "message": f"Payment of {price} successful!",
                 "property_id": prop.id,
                 "is_paid": prop.is_paid,
+                "is_listed": prop.is_listed,
                 "paid_until": prop.paid_until
             }, status=status.HTTP_200_OK)
             
@@ -0,0 +1,195 @@
+"""
+Serving MEDIA_ROOT.
+
+serve_media() checks that the path may be served at all and that the requester
+may see it, then either hands the
+transfer to the front proxy (MEDIA_ACCEL: 'nginx' answers with X-Accel-Redirect
+to the internal MEDIA_ACCEL_PREFIX location, 'sendfile' with X-Sendfile for
+Apache/lighttpd) or, without a proxy, answers with a FileResponse itself. The
+fallback honours If-Modified-Since and single byte ranges, and keeps a real file
+descriptor behind the response so the WSGI server can use sendfile().
+
+Property images are only served while a listing that uses them is visible to
+the requester: public listings to anyone, unpaid ones to their owner (signed in,
+or sending an API bearer token), soft-deleted ones to no one. Content-hashed
+names are not secret -- the API hands them out -- so the check is on the rows
+that reference the file, one lookup on the image column indexes. Files of
+public listings may be cached by shared caches for MEDIA_MAX_AGE seconds only,
+since a listing turns private when its paid period ends; owner-only files are
+never stored by shared caches.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from properties.models import Property
+
+# Media that may be served, by path prefix, with the Property columns that reference
+# such files. Anything else under MEDIA_ROOT (partial chunked uploads, for one) is a 404.
+SERVED_MEDIA = (
+    ('properties/images/', ('image',)),
+    ('properties/renditions/', ('image_thumbnail', 'image_medium', 'image_webp')),
+)
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    The `length` bytes of an open file from its current position. Keeps
+    fileno(), so servers that sendfile() a Content-Length from the file's
+    position still can.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def referencing_columns(path):
+    for prefix, columns in SERVED_MEDIA:
+        if path.startswith(prefix):
+            return columns
+    return None
+
+
+def media_user(request):
+    """The session user, else the bearer of a valid API token (anonymous otherwise)."""
+    if request.user.is_authenticated:
+        return request.user
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        authenticated = None
+    return authenticated[0] if authenticated else request.user
+
+
+def cache_control(request, path, columns):
+    """
+    Cache-Control for a stored file the requester may see, or None when no
+    listing visible to them references it.
+    """
+    references = Q()
+    for column in columns:
+        references |= Q(**{column: path})
+    rows = Property.objects.visible_to(media_user(request)).filter(references)
+    if not settings.REQUIRE_LISTING_PAYMENT:
+        public = True if rows.exists() else None
+    else:
+        # A listed (public) row first; only the requester's own unpaid listings otherwise.
+        public = rows.order_by('-is_listed').values_list('is_listed', flat=True).first()
+    if public is None:
+        return None
+    return f'public, max-age={settings.MEDIA_MAX_AGE}' if public else PRIVATE_CACHE_CONTROL
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range; None if not satisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+@require_safe
+def serve_media(request, path):
+    # Check the prefix on the normalised path: properties/../uploads/ is not public.
+    path = posixpath.normpath(path).lstrip('/')
+    columns = referencing_columns(path)
+    if columns is None:
+        raise Http404
+    caching = cache_control(request, path, columns)
+    if caching is None:
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    last_modified = http_date(stat.st_mtime)
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+        response.headers['Last-Modified'] = last_modified
+        response.headers['Cache-Control'] = caching
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_ACCEL:
+        # The proxy serves the file (ranges and conditional requests included).
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_ACCEL == 'nginx':
+            response.headers['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + path
+        else:
+            response.headers['X-Sendfile'] = full_path
+    else:
+        response = file_response(request, full_path, stat.st_size, content_type, last_modified)
+    response.headers['Last-Modified'] = last_modified
+    response.headers['Cache-Control'] = caching
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def file_response(request, full_path, size, content_type, last_modified):
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    # An If-Range that no longer matches means "send the whole (changed) file".
+    if range_header and (if_range is None or parse_http_date_safe(if_range) == parse_http_date_safe(last_modified)):
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+    handle = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = byte_range
+        handle.seek(start)
+        response = FileResponse(FileRange(handle, end - start + 1), content_type=content_type, status=206)
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response.headers['Content-Length'] = str(end - start + 1)
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
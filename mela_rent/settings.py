@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third-party
     'rest_framework',
@@ -65,6 +66,40 @@ INSTALLED_APPS = [
 REQUIRE_LISTING_PAYMENT = os.environ.get('REQUIRE_LISTING_PAYMENT', 'True').lower() in ('true', '1', 'yes')
 LISTING_EXPIRATION_DAYS = int(os.environ.get('LISTING_EXPIRATION_DAYS', '30'))
 PROPERTY_LISTING_PRICE = float(os.environ.get('PROPERTY_LISTING_PRICE', '15.00'))
+# PostgreSQL text search configuration used for Property.search_vector and ?search= queries
+PROPERTY_SEARCH_CONFIG = os.environ.get('PROPERTY_SEARCH_CONFIG', 'english')
+# Above this many (estimated) matches, property list counts come from the query planner
+PROPERTY_COUNT_ESTIMATE_THRESHOLD = int(os.environ.get('PROPERTY_COUNT_ESTIMATE_THRESHOLD', '10000'))
+# Seconds a property list count is cached per filter signature (0 disables)
+PROPERTY_COUNT_CACHE_TTL = int(os.environ.get('PROPERTY_COUNT_CACHE_TTL', '30'))
+# Seconds map clusters are cached per grid tile and filter signature (0 disables)
+PROPERTY_CLUSTER_CACHE_TTL = int(os.environ.get('PROPERTY_CLUSTER_CACHE_TTL', '60'))
+# Seconds property list/detail responses are cached (0 disables). A write or an expire_listings sweep
+# invalidates them; an expired listing stays visible (and cached) until that sweep runs, so schedule it.
+PROPERTY_CACHE_TTL = int(os.environ.get('PROPERTY_CACHE_TTL', '60'))
+# Seconds between background rebuilds of each process's location autocomplete index (0: never; local writes still apply)
+PROPERTY_LOCATION_INDEX_REFRESH = int(os.environ.get('PROPERTY_LOCATION_INDEX_REFRESH', '300'))
+# Change feed: rows per response, and seconds it stays behind now so slow commits aren't skipped
+PROPERTY_CHANGES_PAGE_SIZE = int(os.environ.get('PROPERTY_CHANGES_PAGE_SIZE', '500'))
+PROPERTY_CHANGES_LAG = float(os.environ.get('PROPERTY_CHANGES_LAG', '5'))
+# Most properties accepted by one bulk create/update request
+PROPERTY_BULK_MAX_ITEMS = int(os.environ.get('PROPERTY_BULK_MAX_ITEMS', '500'))
+# Rows fetched per server-side cursor round trip (and sent per chunk) by the property export
+PROPERTY_EXPORT_CHUNK_SIZE = int(os.environ.get('PROPERTY_EXPORT_CHUNK_SIZE', '2000'))
+# Threads rendering property image thumbnails/WebP; SYNC renders inline after commit instead
+PROPERTY_IMAGE_WORKERS = int(os.environ.get('PROPERTY_IMAGE_WORKERS', '2'))
+# Largest image accepted in a single multipart request / through the chunked upload endpoint (bytes)
+PROPERTY_IMAGE_MAX_UPLOAD_SIZE = int(os.environ.get('PROPERTY_IMAGE_MAX_UPLOAD_SIZE', str(10 * 1024 * 1024)))
+PROPERTY_IMAGE_CHUNKED_MAX_SIZE = int(os.environ.get('PROPERTY_IMAGE_CHUNKED_MAX_SIZE', str(50 * 1024 * 1024)))
+# Seconds a chunked upload may go unwritten before it is abandoned (and deleted by expire_image_uploads)
+PROPERTY_IMAGE_UPLOAD_EXPIRY = int(os.environ.get('PROPERTY_IMAGE_UPLOAD_EXPIRY', str(24 * 60 * 60)))
+# Unexpired chunked uploads one user may hold at once
+PROPERTY_IMAGE_MAX_OPEN_UPLOADS = int(os.environ.get('PROPERTY_IMAGE_MAX_OPEN_UPLOADS', '10'))
+# Longest accepted image side, in pixels
+PROPERTY_IMAGE_MAX_DIMENSION = int(os.environ.get('PROPERTY_IMAGE_MAX_DIMENSION', '8000'))
+# Reuse an owner's stored image when a new upload is perceptually identical to it
+PROPERTY_IMAGE_PERCEPTUAL_DEDUP = os.environ.get('PROPERTY_IMAGE_PERCEPTUAL_DEDUP', 'False').lower() in ('true', '1', 'yes')
+PROPERTY_IMAGE_PROCESSING_SYNC = os.environ.get('PROPERTY_IMAGE_PROCESSING_SYNC', 'False').lower() in ('true', '1', 'yes')
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -112,6 +147,18 @@ DATABASES = {
 }
 
 
+# ---------------------------------------------------------------------------
+# Cache  –  local memory unless CACHE_BACKEND points elsewhere (e.g. Redis)
+# ---------------------------------------------------------------------------
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'mela-rent'),
+    }
+}
+
+
 # ---------------------------------------------------------------------------
 # Password validation
 # ---------------------------------------------------------------------------
@@ -192,6 +239,14 @@ STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media is served by mela_rent.media.serve_media. Behind a proxy, let it send the
+# file: 'nginx' (X-Accel-Redirect to MEDIA_ACCEL_PREFIX, an `internal` location
+# aliased to MEDIA_ROOT) or 'sendfile' (X-Sendfile). Empty: Django streams it.
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Seconds shared caches may keep images of public listings; short, as a listing turns private when it expires
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', '3600'))
+
 
 # ---------------------------------------------------------------------------
 # Default primary key field type
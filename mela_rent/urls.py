@@ -1,15 +1,18 @@
 """
 URL configuration for mela_rent project.
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
+from .media import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -28,8 +31,7 @@ urlpatterns = [
 
     # Messaging app
     path('api/messaging/', include('messaging.urls')),
-]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Media files (access-checked; handed to the proxy when MEDIA_ACCEL is set)
+    re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.*)$', serve_media, name='media'),
+]
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions, status, mixins
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.db import transaction
 from .models import Conversation, Message
 from .serializers import (
     ConversationSerializer,
@@ -9,6 +10,7 @@ from .serializers import (
 )
 from .permissions import IsConversationParticipant
 from users.models import CustomUser
+from properties.models import Property
 
 
 class ConversationViewSet(
@@ -38,6 +40,13 @@ class ConversationViewSet(
             participants=self.request.user
         ).prefetch_related('participants', 'messages')
 
+    def perform_destroy(self, instance):
+        """Deleting a property conversation withdraws its inquiry from the count."""
+        with transaction.atomic():
+            instance.delete()
+            if instance.property_id is not None:
+                Property.objects.filter(pk=instance.property_id).add_to_counter('inquiry_count', -1)
+
     # ------------------------------------------------------------------
     # Custom Actions
     # ------------------------------------------------------------------
@@ -59,16 +68,21 @@ class ConversationViewSet(
         recipient = CustomUser.objects.get(id=serializer.validated_data['recipient_id'])
         property_id = serializer.validated_data.get('property_id')
 
-        # Create the conversation
-        conv = Conversation.objects.create(property_id=property_id)
-        conv.participants.add(request.user, recipient)
+        with transaction.atomic():
+            # Create the conversation
+            conv = Conversation.objects.create(property_id=property_id)
+            conv.participants.add(request.user, recipient)
 
-        # Create the initial message
-        Message.objects.create(
-            conversation=conv,
-            sender=request.user,
-            content=serializer.validated_data['initial_message'],
-        )
+            # Create the initial message
+            Message.objects.create(
+                conversation=conv,
+                sender=request.user,
+                content=serializer.validated_data['initial_message'],
+            )
+
+            # A conversation about a property counts as an inquiry on it
+            if property_id is not None:
+                Property.objects.filter(pk=property_id).add_to_counter('inquiry_count', 1)
 
         return Response(
             ConversationSerializer(conv, context={'request': request}).data,
@@ -0,0 +1,183 @@
+"""
+In-process prefix index of listing locations, for search-box typeahead.
+
+Each process keeps the distinct locations of the public catalogue with their
+visible-listing counts, and a sorted array of (key, location) pairs where the
+keys are the normalised location from each word onwards: "Bole, Addis Ababa"
+is found by "bol", "addis" and "aba". A lookup bisects to the first key with
+the prefix and scans the matching run, so answering never touches PostgreSQL.
+
+The index is built from the database on first use, then kept current two ways:
+- writes in this process (post_save/post_delete, see signals.py) recount the
+  locations they touched once their transaction commits, and
+- every PROPERTY_LOCATION_INDEX_REFRESH seconds a lookup starts a rebuild in a
+  background thread and keeps answering from the current index meanwhile. This
+  picks up writes made by other processes and by update()/bulk_create(), which
+  send no signals (the expire_listings sweeper, bulk endpoints, imports).
+"""
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+')
+# Most suggestions one lookup returns.
+MAX_SUGGESTIONS = 20
+# Prefixes this short match a large part of the index; their answers are memoised per snapshot.
+MEMO_PREFIX_LENGTH = 2
+
+
+def normalise(text):
+    """Casefolded words of `text` separated by single spaces ("Bole,  ADDIS" -> "bole addis")."""
+    return ' '.join(WORD_RE.findall(text.casefold()))
+
+
+def location_keys(location):
+    words = normalise(location).split(' ')
+    return [' '.join(words[start:]) for start in range(len(words)) if words[start]]
+
+
+def count_locations(locations=None):
+    """{location: visible listings}, for every location or only for `locations` (0 when none left)."""
+    from .models import Property
+
+    queryset = Property.objects.visible().exclude(location='')
+    if locations is not None:
+        queryset = queryset.filter(location__in=locations)
+    counts = dict(queryset.order_by().values_list('location').annotate(listings=Count('id')))
+    if locations is not None:
+        counts = {location: counts.get(location, 0) for location in locations}
+    return counts
+
+
+class LocationIndex:
+    """Immutable snapshot (bar its memo); updates build a new one, so lookups never need a lock."""
+
+    def __init__(self, counts, keys=None):
+        self.counts = {location: listings for location, listings in counts.items() if listings > 0}
+        if keys is None:
+            keys = sorted((key, location) for location in self.counts for key in location_keys(location))
+        self.keys = keys
+        self.memo = {}
+
+    def lookup(self, prefix, limit):
+        """Up to `limit` (<= MAX_SUGGESTIONS) (location, listings) starting with `prefix`, most listings first."""
+        prefix = normalise(prefix)
+        if not prefix:
+            return []
+        if len(prefix) > MEMO_PREFIX_LENGTH:
+            return self.search(prefix, limit)
+        if prefix not in self.memo:
+            self.memo[prefix] = self.search(prefix, MAX_SUGGESTIONS)
+        return self.memo[prefix][:limit]
+
+    def search(self, prefix, limit):
+        keys = self.keys
+        matches = set()
+        position = bisect.bisect_left(keys, (prefix,))
+        while position < len(keys) and keys[position][0].startswith(prefix):
+            matches.add(keys[position][1])
+            position += 1
+        best = heapq.nsmallest(limit, matches, key=lambda location: (-self.counts[location], location))
+        return [(location, self.counts[location]) for location in best]
+
+    def updated(self, counts):
+        """A copy with the listing counts of some locations replaced (0 removes a location)."""
+        merged = {**self.counts, **counts}
+        keys = self.keys
+        added = [location for location, listings in counts.items() if listings > 0 and location not in self.counts]
+        removed = {location for location, listings in counts.items() if listings <= 0 and location in self.counts}
+        if added or removed:
+            keys = [entry for entry in keys if entry[1] not in removed] if removed else list(keys)
+            for location in added:
+                for key in location_keys(location):
+                    bisect.insort(keys, (key, location))
+        return LocationIndex(merged, keys)
+
+
+class State:
+    def __init__(self):
+        self.index = None
+        self.built_at = 0.0
+        self.rebuilding = False
+        # Locations written while a rebuild was reading; recounted before it is installed.
+        self.pending = set()
+
+
+_state = State()
+_lock = threading.Lock()
+
+
+def get_location_index():
+    """The current index: built on first use, refreshed in the background once it is stale."""
+    index = _state.index
+    if index is None:
+        return rebuild_location_index()
+    refresh = settings.PROPERTY_LOCATION_INDEX_REFRESH
+    if refresh > 0 and time.monotonic() - _state.built_at > refresh:
+        with _lock:
+            start = not _state.rebuilding
+            if start:
+                _state.rebuilding = True
+        if start:
+            threading.Thread(target=_rebuild_in_background, name='location-index', daemon=True).start()
+    return index
+
+
+def _rebuild_in_background():
+    try:
+        rebuild_location_index()
+    except Exception:
+        # Keep serving the current index; the next attempt waits another refresh period.
+        logger.exception("Rebuilding the location index failed")
+        _state.built_at = time.monotonic()
+    finally:
+        # This thread has its own connection; don't leave it open until the process exits.
+        connection.close()
+
+
+def rebuild_location_index():
+    with _lock:
+        _state.rebuilding = True
+        _state.pending = set()
+    try:
+        index = LocationIndex(count_locations())
+    finally:
+        with _lock:
+            pending, _state.pending = _state.pending, set()
+            _state.rebuilding = False
+    if pending:
+        index = index.updated(count_locations(pending))
+    with _lock:
+        _state.index = index
+        _state.built_at = time.monotonic()
+    return index
+
+
+def refresh_locations(locations):
+    """Recount `locations` into the index (called once a write has committed)."""
+    locations = {location for location in locations if isinstance(location, str) and location}
+    if not locations or _state.index is None:
+        return
+    with _lock:
+        if _state.rebuilding:
+            _state.pending |= locations
+    counts = count_locations(locations)
+    with _lock:
+        if _state.index is not None:
+            _state.index = _state.index.updated(counts)
+
+
+def reset_location_index():
+    """Drop the index; the next lookup rebuilds it."""
+    with _lock:
+        _state.index = None
+        _state.built_at = 0.0
@@ -0,0 +1,139 @@
+"""
+Cache keys for property read endpoints.
+
+A cached property response is only reusable by requests that would see the
+same rows, so every key is built from:
+- the normalised query string (parameter order and paging-only parameters ignored), and
+- the requester's visibility class: anonymous and non-owning users all see the
+  public catalogue, while a user who owns listings also sees their unpaid ones.
+- the listing generation, a counter bumped on every Property write (see
+  signals.py), so nothing cached before a write is ever served after it.
+  Writes bump through bump_on_commit(), once more when their transaction
+  commits, so a response read from the old rows in between is retired too.
+
+Lists ordered by popularity also depend on the favorite counters, which change
+without a Property save; those responses add the popularity generation, bumped
+by every counter update, so other orderings stay cached while favorites come
+and go.
+
+Detail responses depend on a single row and use a per-property version
+instead of the generation, so editing one listing leaves the others cached.
+Visibility is the stored is_listed flag, so it only changes through writes:
+save() or the expire_listings sweeper, which bumps both counters itself.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.settings import api_settings
+
+KEY_PREFIX = 'properties'
+
+
+def visibility_class(request):
+    """'all' when payment gating is off, 'public' for anyone who owns nothing, else 'owner:<id>'."""
+    if not settings.REQUIRE_LISTING_PAYMENT:
+        return 'all'
+    user = request.user
+    if not user.is_authenticated:
+        return 'public'
+    if not hasattr(request, '_owns_properties'):
+        from .models import Property
+        request._owns_properties = Property.objects.active().filter(owner=user).exists()
+    return f'owner:{user.pk}' if request._owns_properties else 'public'
+
+
+def query_signature(request, ignore=()):
+    """Stable digest of the query string, minus the parameters in `ignore`."""
+    params = request.query_params
+    items = sorted(
+        (key, value)
+        for key in params
+        if key not in ignore
+        for value in params.getlist(key)
+    )
+    return hashlib.sha256(repr(items).encode('utf-8')).hexdigest()[:32]
+
+
+def make_key(*parts):
+    return ':'.join([KEY_PREFIX, *(str(part) for part in parts)])
+
+
+LISTING_GENERATION_KEY = make_key('generation')
+
+
+def listing_generation():
+    generation = cache.get(LISTING_GENERATION_KEY)
+    if generation is None:
+        # add() rather than set(): never reset a counter another process just created.
+        cache.add(LISTING_GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(LISTING_GENERATION_KEY, 1)
+    return generation
+
+
+def bump_listing_generation():
+    """Invalidate every cached listing response/count at once."""
+    try:
+        cache.incr(LISTING_GENERATION_KEY)
+    except ValueError:
+        cache.add(LISTING_GENERATION_KEY, 2, timeout=None)
+
+
+def property_version(pk):
+    key = make_key('version', pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_property_version(pk):
+    """Invalidate the cached detail responses of one property."""
+    key = make_key('version', pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, timeout=None)
+
+
+POPULARITY_GENERATION_KEY = make_key('popularity')
+
+
+def sorts_by_popularity(request):
+    return any(
+        term.strip().lstrip('-') == 'popularity'
+        for term in request.query_params.get(api_settings.ORDERING_PARAM, '').split(',')
+    )
+
+
+def popularity_generation():
+    generation = cache.get(POPULARITY_GENERATION_KEY)
+    if generation is None:
+        cache.add(POPULARITY_GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(POPULARITY_GENERATION_KEY, 1)
+    return generation
+
+
+def bump_popularity_generation():
+    """Invalidate the cached listing responses ordered by popularity."""
+    try:
+        cache.incr(POPULARITY_GENERATION_KEY)
+    except ValueError:
+        cache.add(POPULARITY_GENERATION_KEY, 2, timeout=None)
+
+
+def bump_on_commit(bump, *args):
+    """
+    Run a bump now and again once the current transaction commits (right away
+    outside one). Readers between the two still see the old rows and may cache
+    them under the first new generation; the second bump retires those entries.
+    """
+    bump(*args)
+    transaction.on_commit(lambda: bump(*args))
+
+
+def ordering_generation(request):
+    """Extra cache-key/ETag part for orderings on data that changes without a Property write."""
+    return popularity_generation() if sorts_by_popularity(request) else None
@@ -0,0 +1,92 @@
+"""
+Grid clustering of property coordinates for zoomed-out map views.
+
+The world is cut into a fixed lng/lat tile grid per zoom level (2**zoom tiles
+of 360 / 2**zoom degrees on a side), and every tile into CELLS_PER_TILE x
+CELLS_PER_TILE cells. Listings are grouped per cell in one GROUP BY; each
+cell belongs to exactly one tile, so results can be cached tile by tile and a
+viewport is answered from the tiles it overlaps.
+"""
+import math
+
+from django.db.models import Avg, Count, FloatField, Max, Min
+from django.db.models.functions import Cast, Floor
+
+CELLS_PER_TILE = 8
+MAX_ZOOM = 20
+MAX_TILES = 64
+
+
+def tile_span(zoom):
+    """Edge length of a tile, in degrees, at `zoom`."""
+    return 360.0 / (2 ** zoom)
+
+
+def tiles_for_viewport(zoom, min_lng, min_lat, max_lng, max_lat):
+    """The (x, y) tiles overlapping a viewport."""
+    span = tile_span(zoom)
+    last = 2 ** zoom - 1
+
+    def index(value, offset):
+        return min(max(int(math.floor((value + offset) / span)), 0), last)
+
+    return [
+        (x, y)
+        for x in range(index(min_lng, 180), index(max_lng, 180) + 1)
+        for y in range(index(min_lat, 90), index(max_lat, 90) + 1)
+    ]
+
+
+def tile_bounds(zoom, x, y):
+    """(min_lng, min_lat, max_lng, max_lat) of a tile."""
+    span = tile_span(zoom)
+    return x * span - 180, y * span - 90, (x + 1) * span - 180, (y + 1) * span - 90
+
+
+def cluster_tiles(queryset, zoom, tiles):
+    """
+    Cluster `queryset` over `tiles` in a single aggregate query.
+
+    Returns {(x, y): [cluster, ...]} with an entry (possibly empty) for every tile.
+    """
+    result = {tile: [] for tile in tiles}
+    if not tiles:
+        return result
+
+    bounds = [tile_bounds(zoom, x, y) for x, y in tiles]
+    cell = tile_span(zoom) / CELLS_PER_TILE
+    lat = Cast('latitude', FloatField())
+    lng = Cast('longitude', FloatField())
+    rows = (
+        queryset.order_by()
+        .filter(
+            latitude__gte=min(b[1] for b in bounds), latitude__lt=max(b[3] for b in bounds),
+            longitude__gte=min(b[0] for b in bounds), longitude__lt=max(b[2] for b in bounds),
+        )
+        .annotate(cell_x=Floor((lng + 180) / cell), cell_y=Floor((lat + 90) / cell))
+        .values('cell_x', 'cell_y')
+        .annotate(
+            count=Count('id'),
+            latitude=Avg(lat),
+            longitude=Avg(lng),
+            min_price=Min('price'),
+            max_price=Max('price'),
+            property_id=Min('id'),
+        )
+        .order_by()
+    )
+    for row in rows:
+        tile = (int(row['cell_x']) // CELLS_PER_TILE, int(row['cell_y']) // CELLS_PER_TILE)
+        if tile not in result:
+            # The bounding rectangle of several tiles can include cells of tiles not asked for.
+            continue
+        result[tile].append({
+            'count': row['count'],
+            'latitude': round(row['latitude'], 6),
+            'longitude': round(row['longitude'], 6),
+            'min_price': str(row['min_price']),
+            'max_price': str(row['max_price']),
+            # Lets the map open a single listing directly instead of zooming in.
+            'property_id': row['property_id'] if row['count'] == 1 else None,
+        })
+    return result
@@ -0,0 +1,78 @@
+"""
+HTTP validators (ETag / Last-Modified) for property read endpoints.
+
+Validators are computed from a few columns, never from the serialized body,
+so a matching If-None-Match / If-Modified-Since is answered with 304 before
+any serialization happens.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import listing_generation, ordering_generation, query_signature, visibility_class
+from .pagination import PropertyCursorPagination
+
+
+def _digest(*parts):
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def detail_validators(instance):
+    """(etag, last_modified) of one property; payment fields are included for rows changed via update()."""
+    etag = _digest(instance.pk, instance.updated_at.isoformat(), instance.is_paid, instance.is_listed,
+                   instance.paid_until.isoformat() if instance.paid_until else None)
+    return quote_etag(etag), instance.updated_at
+
+
+def list_validators(request, page, paginator=None):
+    """
+    (etag, None) of one list page, from the ids and updated_at of its rows, where
+    the page sits in the filtered set, the listing and popularity generations,
+    the visibility class and the query.
+
+    `page` is the rows the paginator already read to render the response, and
+    the position is what the paginator worked out while reading them: the count
+    (page numbers) or whether neighbouring pages exist (cursor). So the tag costs
+    no query of its own, and a row leaving the set off this page still changes
+    it even when the generation was not bumped in this process (the default
+    cache is per process). A favorite reorders popularity lists without moving
+    updated_at, hence the popularity generation. No Last-Modified is offered for
+    lists, since a soft delete removes rows without any remaining row getting newer.
+    """
+    rows = [
+        (row['id'], row['updated_at']) if isinstance(row, dict) else (row.pk, row.updated_at)
+        for row in page
+    ]
+    etag = _digest(listing_generation(), ordering_generation(request), visibility_class(request),
+                   query_signature(request), page_position(paginator),
+                   [(pk, updated.isoformat()) for pk, updated in rows])
+    return quote_etag(etag), None
+
+
+def page_position(paginator):
+    """What a paginated response reports about the rest of the set, besides its own rows."""
+    if isinstance(paginator, PropertyCursorPagination):
+        return paginator.has_next, paginator.has_previous
+    page = getattr(paginator, 'page', None)
+    if page is None:
+        return None
+    return page.paginator.count, page.has_next(), page.has_previous()
+
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 response carrying the validators if the request's preconditions match, else None."""
+    response = get_conditional_response(
+        request, etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
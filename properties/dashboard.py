@@ -0,0 +1,41 @@
+"""
+Owner dashboard: each of an owner's properties with its activity figures.
+
+All figures are correlated subqueries of the one SELECT that reads the page of
+properties, so a page costs one query however many listings it shows (no
+per-property favorites/conversation/payment requests). Each subquery is an
+index lookup on its table's property foreign key.
+"""
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, JSONObject
+
+from interactions.models import Favorite, PaymentLog
+from messaging.models import Conversation, Message
+
+from .models import Property
+
+
+def count_of(queryset):
+    """SELECT COUNT(*) of a correlated queryset as an expression (0 when empty)."""
+    counted = queryset.order_by().annotate(total=Func(F('pk'), function='COUNT')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def owner_dashboard_queryset(owner):
+    """The owner's live properties (listed or not), annotated with their activity."""
+    latest_payment = (
+        PaymentLog.objects.filter(property=OuterRef('pk'))
+        .order_by('-payment_date', '-pk')
+        .values(json=JSONObject(
+            id='id', amount_paid='amount_paid', status='status', payment_date='payment_date',
+        ))[:1]
+    )
+    return Property.objects.active().filter(owner=owner).annotate(
+        favorites_count=count_of(Favorite.objects.filter(property=OuterRef('pk'))),
+        conversations_count=count_of(Conversation.objects.filter(property=OuterRef('pk'))),
+        # Messages from the other side that the owner has not read yet.
+        unread_messages=count_of(
+            Message.objects.filter(conversation__property=OuterRef('pk'), is_read=False).exclude(sender=owner)
+        ),
+        latest_payment=Subquery(latest_payment),
+    )
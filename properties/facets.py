@@ -0,0 +1,63 @@
+"""
+Facet counts for the property search page.
+
+Every bucket is a COUNT(*) FILTER (WHERE ...) over the filtered queryset, so
+all facets come back from a single aggregate query with one scan of the
+matching rows. Counts reflect the whole filtered set, including the facet's
+own filter (choosing "Villa" leaves only the Villa bucket non-zero).
+"""
+from django.db.models import Count, Q
+
+from .models import Property
+
+# (label, min, max) -- bounds inclusive; None means open-ended.
+BEDROOM_BUCKETS = (
+    ('0', 0, 0),
+    ('1', 1, 1),
+    ('2', 2, 2),
+    ('3', 3, 3),
+    ('4', 4, 4),
+    ('5+', 5, None),
+)
+
+# Price histogram edges: buckets are [edge, next edge), the last one open-ended.
+PRICE_EDGES = (0, 1000, 2500, 5000, 10000, 25000, 50000)
+
+
+def _range(field, low, high, high_inclusive=True):
+    condition = Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__{"lte" if high_inclusive else "lt"}': high})
+    return condition
+
+
+def _facets():
+    """[(facet, bucket, condition)] in response order."""
+    facets = [('house_type', value, Q(house_type=value)) for value, _ in Property.HOUSE_TYPES]
+    facets += [('bedrooms', bucket, _range('bedrooms', bucket[1], bucket[2])) for bucket in BEDROOM_BUCKETS]
+    edges = list(PRICE_EDGES) + [None]
+    facets += [('price', (low, high), _range('price', low, high, high_inclusive=False))
+               for low, high in zip(edges, edges[1:])]
+    facets += [('is_available', value, Q(is_available=value)) for value in (True, False)]
+    return facets
+
+
+def facet_counts(queryset):
+    """Total and per-bucket counts for `queryset`, computed in one aggregate query."""
+    facets = _facets()
+    aggregates = {f'f{i}': Count('id', filter=condition) for i, (_, _, condition) in enumerate(facets)}
+    row = queryset.order_by().aggregate(total=Count('id'), **aggregates)
+
+    result = {'count': row['total'], 'house_type': [], 'bedrooms': [], 'price': [], 'is_available': []}
+    for i, (facet, bucket, _) in enumerate(facets):
+        count = row[f'f{i}']
+        if facet == 'bedrooms':
+            label, low, high = bucket
+            entry = {'label': label, 'min': low, 'max': high, 'count': count}
+        elif facet == 'price':
+            low, high = bucket
+            entry = {'min': low, 'max': high, 'count': count}
+        else:
+            entry = {'value': bucket, 'count': count}
+        result[facet].append(entry)
+    return result
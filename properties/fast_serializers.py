@@ -0,0 +1,140 @@
+"""
+Read-only serialization of property rows straight from QuerySet.values().
+
+A ModelSerializer looks up every field's attribute and runs its
+to_representation() for every row. For list pages the field set is fixed per
+request, so ValuesSerializer resolves it once: each serializer field becomes
+(key, column, converter), where the converter is None for values that are
+already in their JSON form (str, int, bool). Rows are then plain dicts built in
+one pass over the .values() rows, identical to what the serializer would emit.
+
+Only field types whose output can be reproduced exactly are compiled; for
+anything else `supported` is False and the caller keeps the regular serializer.
+"""
+import decimal
+
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import ISO_8601, api_settings
+
+# Fields whose to_representation() returns a str/int/bool column value unchanged.
+# Exact classes only: a subclass may well override to_representation().
+PASSTHROUGH_FIELDS = {
+    serializers.ReadOnlyField,
+    serializers.BooleanField,
+    serializers.IntegerField,
+    serializers.ChoiceField,
+    serializers.CharField,
+}
+# Returned by a converter factory for a field that needs no conversion after all.
+PASSTHROUGH = object()
+
+
+def decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return None
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        return f'{value.quantize(quantum, rounding=rounding, context=context):f}'
+    return convert
+
+
+def datetime_converter(field):
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601:
+        return None
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if tz is None:
+        return None
+
+    def convert(value):
+        value = value.astimezone(tz) if timezone.is_aware(value) else field.enforce_timezone(value)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def bigint_converter(field):
+    if getattr(field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING):
+        return str
+    return PASSTHROUGH
+
+
+def file_converter(field, request):
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return None
+    storage = field.parent.Meta.model._meta.get_field(field.source).storage
+    build_absolute_uri = request.build_absolute_uri if request is not None else (lambda url: url)
+
+    def convert(name):
+        return build_absolute_uri(storage.url(name)) if name else None
+    return convert
+
+
+def list_converter(field):
+    if type(field.child) not in (serializers.CharField, serializers.ChoiceField):
+        return None
+    return list
+
+
+CONVERTERS = {
+    serializers.DecimalField: lambda field, request: decimal_converter(field),
+    serializers.DateTimeField: lambda field, request: datetime_converter(field),
+    serializers.BigIntegerField: lambda field, request: bigint_converter(field),
+    serializers.ImageField: file_converter,
+    serializers.FileField: file_converter,
+    serializers.ListField: lambda field, request: list_converter(field),
+}
+
+
+class ValuesSerializer:
+    """
+    Serializes .values() rows exactly like `serializer` (an unbound
+    PropertySerializer instance, sparse fields already applied) would.
+    """
+
+    def __init__(self, serializer):
+        request = serializer.context.get('request')
+        self.supported = True
+        self.spec = []
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            converter = self.compile(field, request)
+            if converter is False:
+                self.supported = False
+                return
+            self.spec.append((key, field.source, converter))
+        self.columns = tuple(dict.fromkeys(column for _, column, _ in self.spec))
+
+    @staticmethod
+    def compile(field, request):
+        """The converter for `field`, None if no conversion is needed, False if unsupported."""
+        if '.' in field.source or field.source == '*':
+            return False
+        if type(field) in PASSTHROUGH_FIELDS:
+            return None
+        factory = CONVERTERS.get(type(field))
+        if factory is None:
+            return False
+        converter = factory(field, request)
+        if converter is PASSTHROUGH:
+            return None
+        return converter or False
+
+    def serialize(self, rows):
+        spec = self.spec
+        data = []
+        append = data.append
+        for row in rows:
+            item = {}
+            for key, column, convert in spec:
+                value = row[column]
+                item[key] = value if convert is None or value is None else convert(value)
+            append(item)
+        return data
@@ -0,0 +1,47 @@
+"""
+Great-circle helpers for radius and bounding-box search on Property.latitude/longitude.
+
+No PostGIS: a radius query is first narrowed with a lat/lng bounding box
+(a B-tree range scan on property_lat_lng_idx) and then refined with the exact
+haversine distance, computed in SQL so it can also be used for ordering.
+"""
+import math
+
+from django.db.models import F, FloatField
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) of a box that fully contains the circle."""
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0)
+    cos_lat = math.cos(math.radians(lat))
+    if max_lat >= 90.0 or min_lat <= -90.0 or cos_lat < 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
+    delta_lng = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    return min_lat, max_lat, lng - delta_lng, lng + delta_lng
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in kilometres between two points, in Python."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(lat, lng, lat_field='latitude', lng_field='longitude'):
+    """SQL haversine distance (km) from (lat, lng) to each row's coordinates."""
+    row_lat = Radians(Cast(F(lat_field), FloatField()))
+    row_lng = Radians(Cast(F(lng_field), FloatField()))
+    origin_lat = math.radians(lat)
+    origin_lng = math.radians(lng)
+    a = (
+        Power(Sin((row_lat - origin_lat) / 2), 2)
+        + math.cos(origin_lat) * Cos(row_lat) * Power(Sin((row_lng - origin_lng) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
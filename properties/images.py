@@ -0,0 +1,160 @@
+"""
+Image renditions for Property.image.
+
+After an image is saved, a thumbnail (fixed size, cropped to fill), a medium
+JPEG and a medium WebP are rendered with Pillow on a small thread pool, so the
+request that uploaded the image never waits for them. Paths are written back
+to the image_* fields with a single UPDATE that only applies if the original
+is still the one the renditions were made from. Files go through the
+content-addressed image storage (storage.py), so identical renditions are
+stored once; the ones no longer referenced afterwards are released.
+
+The same pass records a perceptual hash of the image (image_phash), which
+Property.save() can use to recognise a re-upload of a picture the owner has
+already stored in another encoding or size.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .cache import bump_listing_generation, bump_property_version
+from .storage import release_files
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'properties/renditions/'
+# Perceptual hashes this close (in bits, out of 64) are taken to be the same picture.
+SIMILAR_IMAGE_DISTANCE = 3
+
+# field: (size, crop to exactly `size`, Pillow format, extension, save options)
+RENDITIONS = {
+    'image_thumbnail': ((320, 240), True, 'JPEG', 'jpg', {'quality': 80, 'optimize': True}),
+    'image_medium': ((1280, 960), False, 'JPEG', 'jpg', {'quality': 85, 'optimize': True}),
+    'image_webp': ((1280, 960), False, 'WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PROPERTY_IMAGE_WORKERS, thread_name_prefix='property-images',
+        )
+    return _executor
+
+
+def render(image, size, crop, image_format, options):
+    """Encode one rendition of an opened (RGB) image; returns the bytes."""
+    if crop:
+        image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    else:
+        image = image.copy()
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def perceptual_hash(image):
+    """
+    64-bit difference hash of a Pillow image, as a signed int for a bigint column.
+    Re-encoded or resized copies of a picture hash alike; different pictures rarely do.
+    """
+    small = image.convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = bits << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits - (1 << 64) if bits >= 1 << 63 else bits
+
+
+def hash_distance(a, b):
+    """Number of differing bits between two perceptual hashes."""
+    return ((a ^ b) & (1 << 64) - 1).bit_count()
+
+
+def file_perceptual_hash(file):
+    """perceptual_hash() of an image file (left rewound); None if it cannot be decoded."""
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            # JPEGs can be decoded at a fraction of full size, plenty for a 9x8 hash.
+            image.draft('L', (64, 64))
+            return perceptual_hash(image)
+    except (OSError, UnidentifiedImageError):
+        return None
+    finally:
+        file.seek(0)
+
+
+def generate_renditions(property_id):
+    """Render and store every rendition of one property's image. Returns True on success."""
+    from .models import Property
+
+    prop = Property.objects.filter(pk=property_id).only('id', 'image', *RENDITIONS).first()
+    if prop is None or not prop.image:
+        return False
+    source = prop.image.name
+    storage = prop.image.storage
+    try:
+        with storage.open(source, 'rb') as handle:
+            with Image.open(handle) as original:
+                image = ImageOps.exif_transpose(original).convert('RGB')
+    except (OSError, UnidentifiedImageError) as error:
+        logger.warning("Cannot render property %s image %s: %s", property_id, source, error)
+        return False
+
+    rendered = {}
+    for field, (size, crop, image_format, extension, options) in RENDITIONS.items():
+        # The storage names the file by its content; only the directory and extension matter.
+        name = f'{RENDITIONS_DIR}{field.removeprefix("image_")}.{extension}'
+        rendered[field] = (name, ContentFile(render(image, size, crop, image_format, options)))
+
+    # Stored and attached in one transaction, which keeps the names locked (storage.lock_name)
+    # until the row that references them commits.
+    with transaction.atomic():
+        paths = {field: storage.save(name, content) for field, (name, content) in rendered.items()}
+
+        # updated_at moves so ETags change; update() skips the signals, so invalidate here.
+        updated = Property.objects.filter(pk=property_id, image=source).update(
+            updated_at=timezone.now(), image_phash=perceptual_hash(image), **paths,
+        )
+    if updated:
+        bump_property_version(property_id)
+        bump_listing_generation()
+        # Renditions replaced by --force re-rendering.
+        previous = {field: getattr(prop, field).name for field in RENDITIONS}
+        release_files(Property, {field: name for field, name in previous.items() if name != paths[field]})
+    else:
+        # The image was replaced meanwhile: these renditions belong to nothing.
+        release_files(Property, paths)
+    return bool(updated)
+
+
+def _run(property_id):
+    try:
+        generate_renditions(property_id)
+    except Exception:
+        logger.exception("Rendering images for property %s failed", property_id)
+    finally:
+        # Pool threads get their own connection; don't leave it open between jobs.
+        connection.close()
+
+
+def schedule_renditions(property_id):
+    """Render a property's image renditions once the current transaction commits."""
+    def submit():
+        if settings.PROPERTY_IMAGE_PROCESSING_SYNC:
+            generate_renditions(property_id)
+        else:
+            get_executor().submit(_run, property_id)
+    transaction.on_commit(submit)
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from properties.models import PropertyImageUpload
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete chunked image uploads (partial file and row) left unwritten for "
+        "PROPERTY_IMAGE_UPLOAD_EXPIRY seconds. Run it from cron, or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep sweeping every --interval seconds instead of exiting after one pass.',
+        )
+        parser.add_argument('--interval', type=float, default=3600.0)
+
+    def handle(self, *args, **options):
+        while True:
+            removed = self.sweep(options['batch_size'])
+            if removed or options['verbosity'] > 1:
+                self.stdout.write(self.style.SUCCESS(f"Removed {removed} abandoned uploads."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size):
+        now = timezone.now()
+        total = 0
+        while True:
+            with transaction.atomic():
+                # Rows being written or attached right now are locked; leave those alone.
+                uploads = list(
+                    PropertyImageUpload.objects.abandoned(now)
+                    .select_for_update(skip_locked=True).order_by('updated_at')[:batch_size]
+                )
+                for upload in uploads:
+                    try:
+                        os.remove(upload.path)
+                    except FileNotFoundError:
+                        pass
+                PropertyImageUpload.objects.filter(pk__in=[upload.pk for upload in uploads]).delete()
+            total += len(uploads)
+            if len(uploads) < batch_size:
+                return total
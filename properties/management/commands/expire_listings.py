@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from properties.cache import bump_listing_generation, bump_property_version
+from properties.models import Property
+
+
+class Command(BaseCommand):
+    help = (
+        "Clear is_listed on listings whose paid_until has passed, in batches. "
+        "Run it from cron every minute, or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep sweeping every --interval seconds instead of exiting after one pass.',
+        )
+        parser.add_argument('--interval', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        while True:
+            expired = self.sweep(options['batch_size'])
+            if expired or options['verbosity'] > 1:
+                self.stdout.write(self.style.SUCCESS(f"Expired {expired} listings."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size):
+        now = timezone.now()
+        total = 0
+        while True:
+            # Oldest first off property_listed_until_idx; each batch is its own short UPDATE.
+            pks = list(
+                Property.objects.expired_listings(now).order_by('paid_until').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                # A listing renewed since the SELECT above is no longer expired; re-check
+                # under row locks so the UPDATE only unlists rows that still are.
+                unlisted = list(
+                    Property.objects.expired_listings(now).filter(pk__in=pks)
+                    .select_for_update().values_list('pk', flat=True)
+                )
+                total += Property.objects.filter(pk__in=unlisted).update(is_listed=False, updated_at=now)
+            if not unlisted:
+                continue
+            # update() skips save() and its signals, so invalidate cached responses here.
+            for pk in unlisted:
+                bump_property_version(pk)
+            bump_listing_generation()
+        return total
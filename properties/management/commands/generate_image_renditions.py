@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from properties.images import generate_renditions
+from properties.models import Property
+
+
+def render_in_thread(pk):
+    try:
+        return generate_renditions(pk)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Render thumbnail, medium and WebP versions of property images. "
+        "By default only images that have no renditions yet are processed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--workers', type=int, default=settings.PROPERTY_IMAGE_WORKERS,
+            help='Rendering threads; 1 renders in the command process itself.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Re-render every image, including those that already have renditions.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Property.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            queryset = queryset.filter(image_thumbnail='')
+
+        last_pk = 0
+        done = failed = 0
+        pool = ThreadPoolExecutor(max_workers=options['workers']) if options['workers'] > 1 else None
+        try:
+            while True:
+                pks = list(
+                    queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+                )
+                if not pks:
+                    break
+                for ok in self.render(pool, pks):
+                    if ok:
+                        done += 1
+                    else:
+                        failed += 1
+                last_pk = pks[-1]
+                self.stdout.write(f"Rendered {done} images, {failed} skipped (up to id {last_pk})")
+        finally:
+            if pool:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered images for {done} properties; {failed} skipped."))
+
+    def render(self, pool, pks):
+        if pool is None:
+            return map(generate_renditions, pks)
+        return pool.map(render_in_thread, pks)
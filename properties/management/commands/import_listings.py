@@ -0,0 +1,120 @@
+import csv
+import json
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from properties.models import Property, PropertyImport
+from properties.serializers import PropertySerializer
+
+
+def read_csv(handle):
+    for row in csv.DictReader(handle):
+        # Empty cells count as missing, so optional columns fall back to their defaults.
+        yield {key: value for key, value in row.items() if key and value not in ('', None)}
+
+
+def read_ndjson(handle):
+    for line in handle:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Passed on as-is so it is rejected like any other invalid row.
+                yield line.rstrip('\n')
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import listings for one owner from a CSV or NDJSON file. Rows are streamed, "
+        "validated like API input and inserted in bulk_create batches; invalid rows are "
+        "written to a rejects file, and --resume continues after the last committed batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--owner', required=True, help='Username that will own the imported listings.')
+        parser.add_argument('--format', choices=sorted(READERS), help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--rejects', help='NDJSON file for rejected rows (row number, data, errors). Default: <path>.rejects',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Skip the rows committed by an earlier, interrupted run of the same file and owner.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f"Unknown format {file_format!r}; pass --format csv or --format ndjson.")
+        try:
+            self.owner = get_user_model().objects.get(username=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['owner']!r}.")
+
+        self.source = os.path.abspath(path)
+        skip = self.read_progress() if options['resume'] else 0
+        rejects_path = options['rejects'] or f'{path}.rejects'
+        # One serializer validates every row, as ListSerializer does with its child.
+        serializer = PropertySerializer(omit=('image', 'image_upload'))
+
+        self.imported = self.rejected = 0
+        self.started = time.monotonic()
+        batch, rejects, row_number = [], [], skip
+        with open(path, newline='', encoding='utf-8') as handle, \
+                open(rejects_path, 'a' if skip else 'w', encoding='utf-8') as self.rejects_file:
+            rows = READERS[file_format](handle)
+            for row_number, row in enumerate(rows, start=1):
+                if row_number <= skip:
+                    continue
+                try:
+                    batch.append(Property(owner=self.owner, **serializer.run_validation(row)))
+                except ValidationError as error:
+                    rejects.append({'row': row_number, 'data': row, 'errors': error.detail})
+                if len(batch) + len(rejects) >= options['batch_size']:
+                    self.commit(batch, rejects, row_number)
+                    batch, rejects = [], []
+            self.commit(batch, rejects, row_number)
+
+        PropertyImport.objects.filter(path=self.source).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.imported} listings; {self.rejected} rows rejected"
+            + (f" (see {rejects_path})." if self.rejected else ".")
+        ))
+
+    def commit(self, batch, rejects, row_number):
+        """
+        Insert one batch and record the row it reached in the same transaction, so a
+        crash keeps both or neither. Rejects are written just before the commit: a
+        crash between the two may list a batch's rejects twice on resume, never drop them.
+        """
+        with transaction.atomic():
+            if batch:
+                Property.objects.bulk_create_listings(batch)
+                # With the first batch, so an interrupted run never leaves a tenant owning listings.
+                self.owner.promote_to_owner()
+            PropertyImport.objects.update_or_create(
+                path=self.source, defaults={'owner': self.owner, 'rows': row_number},
+            )
+            for reject in rejects:
+                self.rejects_file.write(json.dumps(reject, default=str) + '\n')
+            self.rejects_file.flush()
+        self.imported += len(batch)
+        self.rejected += len(rejects)
+        rate = self.imported / max(time.monotonic() - self.started, 1e-6)
+        self.stdout.write(
+            f"Row {row_number}: {self.imported} imported, {self.rejected} rejected ({rate:.0f} rows/s)"
+        )
+
+    def read_progress(self):
+        progress = PropertyImport.objects.filter(path=self.source, owner=self.owner).values_list('rows', flat=True)
+        return progress.first() or 0
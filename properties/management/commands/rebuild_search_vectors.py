@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from properties.cache import bump_listing_generation
+from properties.models import Property, build_search_vector
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill Property.search_vector in primary-key batches. "
+        "Needed after the column is added and after writes that bypass save() (bulk_create, update())."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--missing-only', action='store_true',
+            help='Only fill rows whose search_vector is NULL.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Property.objects.all()
+        if options['missing_only']:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        last_pk = 0
+        total = 0
+        while True:
+            pks = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            # Each batch is its own short UPDATE, so the table is never locked for the whole run.
+            total += Property.objects.filter(pk__in=pks).update(search_vector=build_search_vector())
+            last_pk = pks[-1]
+            self.stdout.write(f"Updated {total} properties (up to id {last_pk})")
+
+        # update() skips the post_save signal, so drop cached search results explicitly.
+        bump_listing_generation()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search vectors for {total} properties."))
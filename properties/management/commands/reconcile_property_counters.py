@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Q
+
+from interactions.models import Favorite
+from messaging.models import Conversation
+from properties.cache import bump_popularity_generation
+from properties.dashboard import count_of
+from properties.models import Property
+
+
+def actual_counts():
+    """Counter column -> COUNT(*) of the rows it counts, correlated to the outer property."""
+    return {
+        'favorite_count': count_of(Favorite.objects.filter(property=OuterRef('pk'))),
+        'inquiry_count': count_of(Conversation.objects.filter(property=OuterRef('pk'))),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Property.favorite_count and inquiry_count from the favorites and "
+        "conversations in primary-key batches, fixing rows that drifted (cascading "
+        "user deletes, writes made outside the API)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report the rows that are off.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Property._base_manager.all()
+        drifted = Q()
+        for field in actual_counts():
+            drifted |= ~Q(**{field: F(f'actual_{field}')})
+
+        last_pk = 0
+        total = 0
+        while True:
+            pks = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            stale = list(
+                queryset.filter(pk__in=pks)
+                .alias(**{f'actual_{field}': count for field, count in actual_counts().items()})
+                .filter(drifted)
+                .values_list('pk', flat=True)
+            )
+            if stale and not options['dry_run']:
+                # Recounted inside the UPDATE, so a favorite added since the check is not lost.
+                queryset.filter(pk__in=stale).update(**actual_counts())
+            total += len(stale)
+            self.stdout.write(f"Checked up to id {last_pk}: {total} properties off")
+
+        if total and not options['dry_run']:
+            # update() bypasses add_to_counter(), so drop popularity-ordered lists explicitly.
+            bump_popularity_generation()
+        verb = 'would be fixed' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"{total} properties {verb}."))
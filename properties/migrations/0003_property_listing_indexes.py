@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_property_latitude_property_longitude'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_paid', True)), fields=['paid_until'], name='property_listed_until_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_paid', True)), fields=['price', 'id'], name='property_listed_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_paid', True)), fields=['created_at', 'id'], name='property_listed_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['price', 'id'], name='property_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at', 'id'], name='property_active_created_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:14
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+def split_amenities(apps, schema_editor):
+    """Populate amenity_tags from the comma-separated amenities text (same rules as parse_amenities)."""
+    Property = apps.get_model('properties', 'Property')
+    batch = []
+    for prop in Property.objects.only('id', 'amenities').iterator(chunk_size=2000):
+        tags = []
+        for part in (prop.amenities or '').split(','):
+            tag = part.strip().lower()[:100]
+            if tag and tag not in tags:
+                tags.append(tag)
+        prop.amenity_tags = tags
+        batch.append(prop)
+        if len(batch) == 2000:
+            Property.objects.bulk_update(batch, ['amenity_tags'])
+            batch = []
+    if batch:
+        Property.objects.bulk_update(batch, ['amenity_tags'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_property_location_trgm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='amenity_tags',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, editable=False, size=None),
+        ),
+        # Fill the column before the index exists, so the GIN index is built once instead of row by row.
+        migrations.RunPython(split_amenities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['amenity_tags'], name='property_amenity_tags_idx'),
+        ),
+    ]
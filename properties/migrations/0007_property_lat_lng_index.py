@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_property_amenity_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('latitude__isnull', False), ('longitude__isnull', False)), fields=['latitude', 'longitude'], name='property_lat_lng_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_listed(apps, schema_editor):
+    """Set is_listed for listings that are currently within a paid period."""
+    Property = apps.get_model('properties', 'Property')
+    Property.objects.filter(is_paid=True, paid_until__gt=timezone.now()).update(is_listed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_property_lat_lng_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='property',
+            name='property_listed_until_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='property_listed_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='property_listed_created_idx',
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='is_listed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_listed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_listed', True)), fields=['paid_until'], name='property_listed_until_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_listed', True)), fields=['price', 'id'], name='property_listed_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_listed', True)), fields=['created_at', 'id'], name='property_listed_created_idx'),
+        ),
+    ]
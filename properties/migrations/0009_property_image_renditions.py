@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_property_is_listed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:20
+
+import properties.storage
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0010_property_image_upload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='image_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=properties.storage.get_image_storage, upload_to='properties/images/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, storage=properties.storage.get_image_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, storage=properties.storage.get_image_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, storage=properties.storage.get_image_storage, upload_to=''),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['image'], name='property_image_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('image_phash__isnull', False)), fields=['owner', 'image_phash'], name='property_owner_phash_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Func, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset):
+    # Same correlated COUNT(*) as properties.dashboard.count_of, on the historical models.
+    counted = queryset.order_by().annotate(total=Func(F('pk'), function='COUNT')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def count_popularity(apps, schema_editor):
+    """Fill the counters from existing favorites and conversations (as reconcile_property_counters does)."""
+    Property = apps.get_model('properties', 'Property')
+    Favorite = apps.get_model('interactions', 'Favorite')
+    Conversation = apps.get_model('messaging', 'Conversation')
+    # Rows with nothing to count keep the default 0.
+    Property.objects.filter(
+        Q(pk__in=Favorite.objects.values('property_id')) | Q(pk__in=Conversation.objects.values('property_id'))
+    ).update(
+        favorite_count=count_of(Favorite.objects.filter(property=OuterRef('pk'))),
+        inquiry_count=count_of(Conversation.objects.filter(property=OuterRef('pk'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_property_updated_index'),
+        ('interactions', '0001_initial'),
+        ('messaging', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='inquiry_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_popularity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_listed', True)), fields=['favorite_count', 'id'], name='property_listed_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['favorite_count', 'id'], name='property_active_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0013_property_popularity_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyimageupload',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='propertyimageupload',
+            index=models.Index(fields=['updated_at'], name='image_upload_updated_idx'),
+        ),
+    ]
@@ -1,19 +1,155 @@
-from django.db import models
+import os
+import uuid
+from datetime import timedelta
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest, Upper
+from django.db.models.base import DEFERRED
 from django.conf import settings
 from django.utils import timezone
 
+from .cache import bump_listing_generation, bump_on_commit, bump_popularity_generation, bump_property_version
+from .images import (
+    RENDITIONS, SIMILAR_IMAGE_DISTANCE, file_perceptual_hash, hash_distance, schedule_renditions,
+)
+from .storage import IMAGE_FIELDS, get_image_storage, lock_name, release_files
+
+# Columns folded into Property.search_vector, with their full-text weights.
+SEARCH_VECTOR_WEIGHTS = (
+    ('title', 'A'),
+    ('location', 'B'),
+    ('description', 'C'),
+)
+
+
+def parse_amenities(text):
+    """
+    Normalise the free-text amenities field into tags: split on commas,
+    trim, lower-case and drop blanks/duplicates ("WiFi, Pool" -> ['wifi', 'pool']).
+    """
+    tags = []
+    for part in (text or '').split(','):
+        tag = part.strip().lower()[:100]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def build_search_vector():
+    """The weighted tsvector expression stored in Property.search_vector."""
+    config = settings.PROPERTY_SEARCH_CONFIG
+    vectors = [SearchVector(field, weight=weight, config=config) for field, weight in SEARCH_VECTOR_WEIGHTS]
+    combined = vectors[0]
+    for vector in vectors[1:]:
+        combined = combined + vector
+    return combined
+
 class PropertyQuerySet(models.QuerySet):
     def active(self):
         """Returns only properties that have not been soft deleted."""
         return self.filter(is_deleted=False)
 
+    def visible(self):
+        """
+        Returns the properties the public may see.
+        When REQUIRE_LISTING_PAYMENT is on, that is listings whose stored is_listed
+        flag is set; the predicate matches the partial indexes on Property.
+        """
+        queryset = self.active()
+        if settings.REQUIRE_LISTING_PAYMENT:
+            queryset = queryset.filter(is_listed=True)
+        return queryset
+
+    def visible_to(self, user):
+        """
+        Returns the public listings plus, for an authenticated user, their own
+        properties regardless of payment status.
+
+        The two branches stay a single OR: with the property_active_* indexes the
+        planner walks the requested sort order and stops after one page, which
+        benchmarks/bench_listing_indexes.py shows is far cheaper than
+        id IN (visible UNION mine) -- that form has to materialise every visible id first.
+        """
+        if not settings.REQUIRE_LISTING_PAYMENT or not user.is_authenticated:
+            return self.visible()
+        return self.active().filter(Q(is_listed=True) | Q(owner=user))
+
+    def expired_listings(self, now=None):
+        """Listed properties whose paid period is over (served by property_listed_until_idx)."""
+        return self.filter(is_listed=True, paid_until__lte=now or timezone.now())
+
+    def add_to_counter(self, field, delta):
+        """
+        Atomically add `delta` to a popularity counter (favorite_count /
+        inquiry_count) with a single UPDATE, never going below zero. The row's
+        updated_at is left alone: a favorite is not an edit of the listing.
+        """
+        updated = self.update(**{field: Greatest(F(field) + delta, 0)})
+        if updated:
+            bump_on_commit(bump_popularity_generation)
+        return updated
+
+    def bulk_create_listings(self, properties, batch_size=None):
+        """
+        bulk_create() plus what save() and the post_save signal do for each row:
+        derived amenity_tags/is_listed, the search vector and cache invalidation.
+        """
+        for prop in properties:
+            prop.amenity_tags = parse_amenities(prop.amenities)
+            prop.is_listed = prop.compute_is_listed()
+        created = self.bulk_create(properties, batch_size=batch_size)
+        self.filter(pk__in=[prop.pk for prop in created]).update(search_vector=build_search_vector())
+        bump_on_commit(bump_listing_generation)
+        return created
+
+    def bulk_update_listings(self, properties, fields, batch_size=None):
+        """bulk_update() of `fields`, keeping derived columns, updated_at and caches in step like save()."""
+        fields = set(fields)
+        if 'amenities' in fields:
+            fields.add('amenity_tags')
+        if {'is_paid', 'paid_until'} & fields:
+            fields.add('is_listed')
+        now = timezone.now()
+        for prop in properties:
+            prop.amenity_tags = parse_amenities(prop.amenities)
+            prop.is_listed = prop.compute_is_listed(now)
+            prop.updated_at = now
+        updated = self.bulk_update(properties, [*fields, 'updated_at'], batch_size=batch_size)
+        pks = [prop.pk for prop in properties]
+        if fields & {field for field, _ in SEARCH_VECTOR_WEIGHTS}:
+            self.filter(pk__in=pks).update(search_vector=build_search_vector())
+        for pk in pks:
+            bump_on_commit(bump_property_version, pk)
+        bump_on_commit(bump_listing_generation)
+        return updated
+
 class PropertyManager(models.Manager):
     def get_queryset(self):
-        return PropertyQuerySet(self.model, using=self._db)
+        # search_vector is only ever read inside SQL, so don't ship it to Python.
+        return PropertyQuerySet(self.model, using=self._db).defer('search_vector')
         
     def active(self):
         return self.get_queryset().active()
 
+    def visible(self):
+        return self.get_queryset().visible()
+
+    def visible_to(self, user):
+        return self.get_queryset().visible_to(user)
+
+    def expired_listings(self, now=None):
+        return self.get_queryset().expired_listings(now=now)
+
+    def bulk_create_listings(self, properties, batch_size=None):
+        return self.get_queryset().bulk_create_listings(properties, batch_size=batch_size)
+
+    def bulk_update_listings(self, properties, fields, batch_size=None):
+        return self.get_queryset().bulk_update_listings(properties, fields, batch_size=batch_size)
+
 class Property(models.Model):
     HOUSE_TYPES = [
         ('Condo', 'Condo'),
@@ -34,15 +170,27 @@ class Property(models.Model):
     bathrooms = models.DecimalField(max_digits=4, decimal_places=1)
     max_guests = models.IntegerField()
     amenities = models.TextField()
+    # Derived from `amenities` on save(); GIN-indexed for all-of (@>) / any-of (&&) filtering.
+    amenity_tags = ArrayField(models.CharField(max_length=100), default=list, blank=True, editable=False)
     
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
 
-    image = models.ImageField(upload_to='properties/images/', null=True, blank=True)
+    # Stored by content hash, so identical files are kept once (see storage.py).
+    image = models.ImageField(upload_to='properties/images/', storage=get_image_storage, null=True, blank=True)
+    # Renditions of `image`, rendered off the request thread (see images.py); empty until ready.
+    image_thumbnail = models.ImageField(blank=True, editable=False, storage=get_image_storage)
+    image_medium = models.ImageField(blank=True, editable=False, storage=get_image_storage)
+    image_webp = models.ImageField(blank=True, editable=False, storage=get_image_storage)
+    # Perceptual hash of `image`, recorded with the renditions; see reuse_similar_image().
+    image_phash = models.BigIntegerField(null=True, blank=True, editable=False)
     
     is_available = models.BooleanField(default=True)
     is_paid = models.BooleanField(default=False)
     paid_until = models.DateTimeField(null=True, blank=True)
+    # is_paid and paid_until still in the future, stored so visibility is a plain
+    # column test. Set by save(), cleared by the expire_listings sweeper.
+    is_listed = models.BooleanField(default=False, editable=False)
     
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
@@ -50,8 +198,187 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Popularity counters, kept by the favorite/conversation views with add_to_counter()
+    # and corrected by reconcile_property_counters. They change without touching
+    # updated_at, so they are not part of the API payload; they only drive ?ordering=popularity.
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+    inquiry_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Maintained by save() and the rebuild_search_vectors command; never set directly.
+    search_vector = SearchVectorField(null=True, editable=False)
+
     objects = PropertyManager()
 
+    class Meta:
+        indexes = [
+            # Listed rows by paid_until: the expire_listings sweeper walks this
+            # index to find listings whose paid period has ended.
+            models.Index(
+                fields=['paid_until'],
+                name='property_listed_until_idx',
+                condition=Q(is_listed=True),
+            ),
+            # Public listing predicate: is_deleted=False AND is_listed=True.
+            # One index per ordering_fields key (id is the tiebreaker), so a sorted
+            # anonymous page is an index scan that stops after PAGE_SIZE rows instead of a full sort.
+            models.Index(
+                fields=['price', 'id'],
+                name='property_listed_price_idx',
+                condition=Q(is_deleted=False, is_listed=True),
+            ),
+            models.Index(
+                fields=['created_at', 'id'],
+                name='property_listed_created_idx',
+                condition=Q(is_deleted=False, is_listed=True),
+            ),
+            models.Index(
+                fields=['favorite_count', 'id'],
+                name='property_listed_popular_idx',
+                condition=Q(is_deleted=False, is_listed=True),
+            ),
+            # Same sort keys over every live row: serves the owner's "paid OR mine"
+            # branch and listing with REQUIRE_LISTING_PAYMENT switched off.
+            models.Index(
+                fields=['price', 'id'],
+                name='property_active_price_idx',
+                condition=Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=['created_at', 'id'],
+                name='property_active_created_idx',
+                condition=Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=['favorite_count', 'id'],
+                name='property_active_popular_idx',
+                condition=Q(is_deleted=False),
+            ),
+            # The change feed walks every row, deleted ones included, in (updated_at, id) order.
+            models.Index(fields=['updated_at', 'id'], name='property_updated_idx'),
+            # Stored name -> rows lookups: reference checks before a shared image file is
+            # deleted (storage.release_files) and access checks when it is served (mela_rent/media.py).
+            models.Index(fields=['image'], name='property_image_idx'),
+            models.Index(fields=['image_thumbnail'], name='property_thumbnail_idx'),
+            models.Index(fields=['image_medium'], name='property_medium_idx'),
+            models.Index(fields=['image_webp'], name='property_webp_idx'),
+            # An owner's earlier upload of the same picture (reuse_similar_image).
+            models.Index(
+                fields=['owner', 'image_phash'],
+                name='property_owner_phash_idx',
+                condition=Q(image_phash__isnull=False),
+            ),
+            GinIndex(fields=['search_vector'], name='property_search_vector_idx'),
+            GinIndex(fields=['amenity_tags'], name='property_amenity_tags_idx'),
+            # Bounding-box prefilter for ?near= / ?bbox=: a latitude range scan with
+            # longitude checked from the index entries, before the exact haversine test.
+            models.Index(
+                fields=['latitude', 'longitude'],
+                name='property_lat_lng_idx',
+                condition=Q(is_deleted=False, latitude__isnull=False, longitude__isnull=False),
+            ),
+            # Trigram index on UPPER(location): serves Django's icontains (UPPER(...) LIKE UPPER(...))
+            # as well as the fuzzy %> / word_similarity matching, which is case-insensitive anyway.
+            GinIndex(
+                OpClass(Upper('location'), name='gin_trgm_ops'),
+                name='property_location_trgm_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so save() can tell which columns actually changed.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def has_changed(self, *fields):
+        """True if any of `fields` differs from the value loaded from the database."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(
+            loaded.get(field, DEFERRED) is DEFERRED or loaded[field] != getattr(self, field)
+            for field in fields
+        )
+
+    def save(self, *args, **kwargs):
+        search_fields = [field for field, _ in SEARCH_VECTOR_WEIGHTS]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'amenities' in update_fields:
+            self.amenity_tags = parse_amenities(self.amenities)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'amenity_tags'}
+        if update_fields is None or {'is_paid', 'paid_until'} & set(update_fields):
+            self.is_listed = self.compute_is_listed()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'is_listed'}
+        refresh_search = self.has_changed(*search_fields) and (
+            update_fields is None or bool(set(update_fields) & set(search_fields))
+        )
+        # A stored (or reused) image name stays locked until the row referencing it
+        # commits, so release_files() can't delete the file meanwhile (see storage.py).
+        with transaction.atomic(savepoint=False):
+            image_saved = update_fields is None or 'image' in update_fields
+            new_upload = image_saved and self.image and not self.image._committed
+            if new_upload and settings.PROPERTY_IMAGE_PERCEPTUAL_DEDUP:
+                self.reuse_similar_image()
+            image_changed = image_saved and self.has_changed('image')
+            replaced_files = None
+            if image_changed:
+                # Read from the row: renditions may have been written since this instance was loaded.
+                if self.pk is not None:
+                    replaced_files = type(self)._base_manager.filter(pk=self.pk).values(*IMAGE_FIELDS).first()
+                # Renditions of the previous image no longer apply; new ones are rendered after commit.
+                for field in RENDITIONS:
+                    setattr(self, field, '')
+                self.image_phash = None
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], *RENDITIONS, 'image_phash'}
+            super().save(*args, **kwargs)
+            if image_changed:
+                if replaced_files:
+                    release_files(type(self), replaced_files)
+                if self.image:
+                    schedule_renditions(self.pk)
+            if refresh_search:
+                # The vector is computed by PostgreSQL from the stored columns, so it
+                # is written with a follow-up UPDATE rather than as part of the INSERT.
+                type(self).objects.filter(pk=self.pk).update(search_vector=build_search_vector())
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def reuse_similar_image(self):
+        """
+        If the owner already has a listing with the same picture (perceptual hashes
+        within SIMILAR_IMAGE_DISTANCE), point `image` at that stored file instead
+        of storing the new upload.
+        """
+        phash = file_perceptual_hash(self.image.file)
+        if phash is None:
+            return
+        # An owner has few enough images to compare in Python; the index narrows it to them.
+        candidates = (
+            type(self)._base_manager
+            .filter(owner_id=self.owner_id, image_phash__isnull=False)
+            .exclude(pk=self.pk).exclude(image='')
+            .values_list('image', 'image_phash')
+        )
+        distance, existing = min(
+            ((hash_distance(phash, other), image) for image, other in candidates), default=(None, None),
+        )
+        if existing and distance <= SIMILAR_IMAGE_DISTANCE:
+            lock_name(existing)
+            # Checked under the lock: a release that got there first has deleted it.
+            if self.image.storage.exists(existing):
+                self.image = existing
+
+    def compute_is_listed(self, now=None):
+        """Whether the listing is within a paid period."""
+        return bool(self.is_paid and self.paid_until and self.paid_until > (now or timezone.now()))
+
     def delete(self, using=None, keep_parents=False):
         """Perform soft delete instead of actual delete."""
         self.is_deleted = True
@@ -59,8 +386,90 @@ class Property(models.Model):
         self.save()
 
     def hard_delete(self):
-        """Actual deletion from the database."""
+        """Actual deletion from the database; image files no other row uses are removed too."""
+        files = {field: getattr(self, field).name for field in IMAGE_FIELDS}
         super().delete()
+        release_files(type(self), files)
 
     def __str__(self):
         return f"{self.title} - {self.location}"
+
+
+class PropertyImageUploadQuerySet(models.QuerySet):
+    def cutoff(self, now=None):
+        return (now or timezone.now()) - timedelta(seconds=settings.PROPERTY_IMAGE_UPLOAD_EXPIRY)
+
+    def unexpired(self, now=None):
+        return self.filter(updated_at__gt=self.cutoff(now))
+
+    def abandoned(self, now=None):
+        """Uploads untouched for PROPERTY_IMAGE_UPLOAD_EXPIRY (served by image_upload_updated_idx)."""
+        return self.filter(updated_at__lte=self.cutoff(now))
+
+
+class PropertyImageUpload(models.Model):
+    """
+    A resumable, chunked image upload. Chunks are appended to a partial file
+    under MEDIA_ROOT/uploads/partial/ until `offset` reaches `size`; the completed
+    file is then attached to a property via PropertySerializer.image_upload.
+
+    Uploads not written to for PROPERTY_IMAGE_UPLOAD_EXPIRY seconds (never
+    finished, or finished but never attached) are abandoned: they no longer
+    count or attach, and the expire_image_uploads command deletes them.
+    """
+    PARTIAL_DIR = os.path.join('uploads', 'partial')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='property_image_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PropertyImageUploadQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='image_upload_updated_idx'),
+        ]
+
+    @property
+    def path(self):
+        return os.path.join(settings.MEDIA_ROOT, self.PARTIAL_DIR, f'{self.id}.part')
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
+    @property
+    def is_abandoned(self):
+        return self.updated_at <= type(self).objects.cutoff()
+
+    def discard(self):
+        """Delete the partial file and the upload record."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.delete()
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class PropertyImport(models.Model):
+    """
+    Progress of an import_listings run, keyed by the absolute path of its source
+    file. `rows` is the last source row whose batch has committed, and it is
+    saved in that batch's transaction, so --resume never inserts a row twice.
+    The record is deleted once the whole file has been imported.
+    """
+    path = models.CharField(max_length=1024, unique=True)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='property_imports')
+    rows = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.path} ({self.rows} rows)"
@@ -0,0 +1,311 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import listing_generation, make_key, query_signature, visibility_class
+
+
+class EstimatedCountPage(Page):
+    # Set when the total is an estimate: whether a row beyond this page was actually found.
+    has_more = None
+
+    def has_next(self):
+        if self.has_more is None:
+            return super().has_next()
+        return self.has_more
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Django Paginator whose `count` comes from the PostgreSQL planner once the
+    result set is large.
+
+    The planner's row estimate (EXPLAIN, which is driven by pg_class.reltuples and
+    column statistics) is used when it reaches `threshold`; smaller sets are
+    counted exactly, since COUNT(*) over them is cheap. Either result may be
+    cached under `cache_key` for `cache_timeout` seconds.
+
+    With an approximate total, page numbers past the estimate are still served,
+    and has_next() is decided by fetching one extra row instead of trusting the estimate.
+    """
+
+    def __init__(self, object_list, per_page, threshold, cache_key=None, cache_timeout=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.threshold = threshold
+        self.cache_key = cache_key
+        self.cache_timeout = cache_timeout
+        self.approximate = False
+
+    @cached_property
+    def count(self):
+        if self.cache_key:
+            cached = cache.get(self.cache_key)
+            if cached is not None:
+                count, self.approximate = cached
+                return count
+
+        estimate = self.estimate_count()
+        if estimate is not None and estimate >= self.threshold:
+            count, self.approximate = estimate, True
+        else:
+            count, self.approximate = super().count, False
+
+        if self.cache_key:
+            cache.set(self.cache_key, (count, self.approximate), self.cache_timeout)
+        return count
+
+    def estimate_count(self):
+        """Planner row estimate for the (unordered) queryset, or None off PostgreSQL."""
+        queryset = self.object_list.order_by()
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def validate_number(self, number):
+        self.count  # resolves self.approximate
+        if not self.approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedCountPage(*args, **kwargs)
+
+
+class PropertyPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination that avoids exact COUNT(*) on large result sets.
+
+    Below PROPERTY_COUNT_ESTIMATE_THRESHOLD rows the count is exact; above it the
+    planner estimate is returned and the response carries "approximate": true.
+    Counts are cached per filter signature (query string + visibility class) for
+    PROPERTY_COUNT_CACHE_TTL seconds, so paging through one search counts once;
+    any Property write starts a new listing generation and so a fresh count.
+    """
+    # Parameters that change which page is shown but not how many rows match.
+    count_ignored_params = ('page', 'ordering', 'pagination', 'cursor')
+
+    @classmethod
+    def filter_set_key(cls, kind, request):
+        """Cache key for a figure about the filtered set (`kind`), or None when caching is off."""
+        if settings.PROPERTY_COUNT_CACHE_TTL <= 0:
+            return None
+        return make_key(
+            kind,
+            listing_generation(),
+            visibility_class(request),
+            query_signature(request, ignore=cls.count_ignored_params),
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_cache_key = self.filter_set_key('count', request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        # Called by PageNumberPagination.paginate_queryset() in place of a Paginator class.
+        return EstimatedCountPaginator(
+            object_list,
+            per_page,
+            threshold=settings.PROPERTY_COUNT_ESTIMATE_THRESHOLD,
+            cache_key=self.count_cache_key,
+            cache_timeout=settings.PROPERTY_COUNT_CACHE_TTL,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'approximate': self.page.paginator.approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['approximate'] = {'type': 'boolean', 'example': False}
+        return response_schema
+
+
+class PropertyCursorPagination(BasePagination):
+    """
+    Keyset ("seek") pagination for the property list.
+
+    Every page is fetched with WHERE (key, id) > (last_key, last_id) ORDER BY key, id
+    LIMIT page_size + 1, which walks the property_*_price/created/popular indexes, so page
+    1000 costs the same as page 1 and no COUNT(*) is ever issued. `id` is the
+    unique tiebreaker, so rows sharing a price are never skipped or repeated.
+    (Popularity is a live counter: a row whose favorite_count changes between
+    two pages can move across the cursor and be seen twice or not at all.)
+
+    Cursors are opaque, URL-safe tokens that also record the ordering they were
+    issued for; reusing one with a different ?ordering= is rejected.
+
+    Only the keyset orderings are available: ?ordering=distance and multi-key
+    orderings are a 400, and relevance ordering (?search= rank, fuzzy ?location=
+    similarity) is not applied -- without ?ordering= pages are newest first.
+    """
+    cursor_query_param = 'cursor'
+    ordering_param = api_settings.ORDERING_PARAM
+    page_size = api_settings.PAGE_SIZE
+    default_ordering = '-created_at'
+    # ?ordering= value -> model field used as the leading keyset column.
+    ordering_fields = {
+        'price': 'price',
+        'created_at': 'created_at',
+        'popularity': 'favorite_count',
+    }
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request)
+        key, descending = self.parse_ordering(self.ordering)
+        self.key_field = self.ordering_fields[key]
+        model_field = queryset.model._meta.get_field(self.key_field)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor['r'])
+        # A "previous" page is read by walking the index the other way and flipping the rows back.
+        walk_descending = descending != self.reverse
+
+        if cursor is not None:
+            try:
+                value = model_field.to_python(cursor['v'])
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self.seek_condition(value, cursor['id'], walk_descending))
+
+        prefix = '-' if walk_descending else ''
+        rows = list(queryset.order_by(f'{prefix}{self.key_field}', f'{prefix}id')[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.page = rows
+        if self.reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return rows
+
+    def seek_condition(self, value, pk, descending):
+        """Row-value comparison (key, id) > (value, pk), spelled so PostgreSQL can use the index range."""
+        op = 'lt' if descending else 'gt'
+        bound = 'lte' if descending else 'gte'
+        return Q(**{f'{self.key_field}__{bound}': value}) & (
+            Q(**{f'{self.key_field}__{op}': value}) | Q(**{self.key_field: value, f'id__{op}': pk})
+        )
+
+    def get_ordering(self, request):
+        """
+        The one ?ordering= key the keyset walks. Anything else is rejected rather
+        than replaced by the default, which would quietly drop the order asked for.
+        """
+        terms = [term.strip() for term in request.query_params.get(self.ordering_param, '').split(',') if term.strip()]
+        if not terms:
+            return self.default_ordering
+        if len(terms) > 1 or terms[0].lstrip('-') not in self.ordering_fields:
+            raise ValidationError({self.ordering_param: (
+                f"Cursor pagination orders by one of {', '.join(self.ordering_fields)} "
+                f"(prefix '-' for descending); use page numbers for other orderings."
+            )})
+        return terms[0]
+
+    @staticmethod
+    def parse_ordering(ordering):
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def get_position(self, item):
+        # Rows are model instances, or dicts when the list is read through .values().
+        if isinstance(item, dict):
+            return item[self.key_field], item['id']
+        return getattr(item, self.key_field), item.pk
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            cursor = {'o': payload['o'], 'v': payload['v'], 'id': int(payload['id']), 'r': bool(payload['r'])}
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor['o'] != self.ordering:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, item, reverse):
+        value, pk = self.get_position(item)
+        payload = {'o': self.ordering, 'v': str(value), 'id': pk, 'r': reverse}
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        return replace_query_param(self.base_url, self.cursor_query_param, token.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+
+
+class PropertySearchFilter(filters.SearchFilter):
+    """
+    PostgreSQL full-text replacement for DRF's SearchFilter.
+
+    ?search= is parsed with websearch_to_tsquery (quoted phrases, "or" and
+    -exclusions work as users expect) and matched against the GIN-indexed
+    Property.search_vector, where title, location and description carry
+    weights A, B and C. Matches are annotated with `rank` and returned best
+    first unless the client asked for an explicit ?ordering=.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+        if not text:
+            return queryset
+
+        query = SearchQuery(text, search_type='websearch', config=settings.PROPERTY_SEARCH_CONFIG)
+        # OrderingFilter runs after this backend and replaces this order when ?ordering= is given.
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-id')
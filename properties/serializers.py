@@ -1,12 +1,53 @@
+import os
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import serializers
-from .models import Property
+from .models import Property, PropertyImageUpload
+
+
+class SparseFieldsMixin:
+    """
+    Lets the caller narrow the output with `fields` (keep only these) and
+    `omit` (drop these) keyword arguments; unknown names are ignored.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
 
-class PropertySerializer(serializers.ModelSerializer):
-    owner = serializers.ReadOnlyField(source='owner.id')
+    def model_columns(self):
+        """Model fields read by the remaining serializer fields, for QuerySet.only()."""
+        model_fields = {field.attname for field in self.Meta.model._meta.concrete_fields}
+        model_fields |= {field.name for field in self.Meta.model._meta.concrete_fields}
+        return [
+            field.source for field in self.fields.values()
+            if field.source in model_fields
+        ]
+
+
+class PropertySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # owner_id rather than owner.id: no join or per-row user query.
+    owner = serializers.ReadOnlyField(source='owner_id')
+    # A completed chunked upload (see PropertyImageUploadViewSet) to use as `image`.
+    image_upload = serializers.PrimaryKeyRelatedField(
+        queryset=PropertyImageUpload.objects.filter(completed_at__isnull=False),
+        write_only=True, required=False,
+    )
 
     class Meta:
         model = Property
-        exclude = ('is_deleted', 'deleted_at')
+        exclude = (
+            'is_deleted', 'deleted_at', 'search_vector', 'image_phash', 'favorite_count', 'inquiry_count',
+        )
         read_only_fields = ('owner', 'created_at', 'updated_at', 'is_paid', 'paid_until')
 
     def validate_price(self, value):
@@ -28,3 +69,99 @@ class PropertySerializer(serializers.ModelSerializer):
         if value <= 0:
             raise serializers.ValidationError("Max guests must be at least 1.")
         return value
+
+    def validate_image_upload(self, value):
+        request = self.context.get('request')
+        if request is None or value.owner_id != request.user.id or value.is_abandoned:
+            raise serializers.ValidationError("Unknown upload.")
+        return value
+
+    def create(self, validated_data):
+        with self.uploaded_image(validated_data):
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with self.uploaded_image(validated_data):
+            return super().update(instance, validated_data)
+
+    @contextmanager
+    def uploaded_image(self, validated_data):
+        """Use a completed chunked upload as `image`; the upload is removed once saved."""
+        upload = validated_data.pop('image_upload', None)
+        if upload is None:
+            yield
+            return
+        with transaction.atomic():
+            # Locked, so expire_image_uploads (which skips locked rows) can't delete it meanwhile.
+            upload = PropertyImageUpload.objects.select_for_update().filter(pk=upload.pk).first()
+            if upload is None:
+                raise serializers.ValidationError({'image_upload': ["Unknown upload."]})
+            # The storage copies the partial file over in chunks; it is never read whole.
+            with open(upload.path, 'rb') as handle:
+                validated_data['image'] = File(handle, name=upload.filename)
+                yield
+            upload.discard()
+
+
+class PropertyListSerializer(PropertySerializer):
+    """
+    Compact representation for list pages: everything a result card needs (with
+    image_thumbnail for the picture), without the long description/amenities text
+    or the larger renditions (fetch the detail, or ask for them with ?fields=).
+    """
+
+    class Meta(PropertySerializer.Meta):
+        exclude = PropertySerializer.Meta.exclude + (
+            'description', 'amenities', 'amenity_tags', 'image_medium', 'image_webp',
+        )
+
+
+class OwnerDashboardSerializer(PropertyListSerializer):
+    """
+    A dashboard row: the compact listing plus the activity figures annotated
+    by dashboard.owner_dashboard_queryset().
+    """
+    favorites_count = serializers.IntegerField(read_only=True)
+    conversations_count = serializers.IntegerField(read_only=True)
+    unread_messages = serializers.IntegerField(read_only=True)
+    latest_payment = serializers.SerializerMethodField()
+    days_until_expiry = serializers.SerializerMethodField()
+
+    def get_latest_payment(self, obj):
+        payment = obj.latest_payment
+        if payment is None:
+            return None
+        # Built as JSON by PostgreSQL; present it the way the API renders these fields elsewhere.
+        return {
+            **payment,
+            'amount_paid': serializers.DecimalField(max_digits=10, decimal_places=2).to_representation(
+                str(payment['amount_paid'])
+            ),
+            'payment_date': serializers.DateTimeField().to_representation(parse_datetime(payment['payment_date'])),
+        }
+
+    def get_days_until_expiry(self, obj):
+        """Calendar days until paid_until (0 on the last day, negative once expired)."""
+        if obj.paid_until is None:
+            return None
+        return (timezone.localdate(obj.paid_until) - timezone.localdate()).days
+
+
+class PropertyImageUploadSerializer(serializers.ModelSerializer):
+    completed = serializers.BooleanField(source='is_complete', read_only=True)
+
+    class Meta:
+        model = PropertyImageUpload
+        fields = ('id', 'filename', 'size', 'offset', 'completed', 'created_at')
+        read_only_fields = ('offset', 'created_at')
+
+    def validate_filename(self, value):
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        limit = settings.PROPERTY_IMAGE_CHUNKED_MAX_SIZE
+        if value <= 0:
+            raise serializers.ValidationError("Size must be greater than zero.")
+        if value > limit:
+            raise serializers.ValidationError(f"Images may be at most {limit // (1024 * 1024)} MB.")
+        return value
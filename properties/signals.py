@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import refresh_locations
+from .cache import bump_listing_generation, bump_on_commit, bump_property_version
+from .models import Property
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_listing_caches(sender, instance, **kwargs):
+    # Soft deletes go through save(), hard deletes through post_delete.
+    bump_on_commit(bump_listing_generation)
+    bump_on_commit(bump_property_version, instance.pk)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def update_location_index(sender, instance, **kwargs):
+    # save() only replaces _loaded_values after post_save, so it still holds the
+    # location the row had before: a moved listing leaves its old location too.
+    # Payment and soft-delete changes recount the (unchanged) current location.
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    locations = {loaded.get('location'), instance.__dict__.get('location')}
+    transaction.on_commit(lambda: refresh_locations(locations))
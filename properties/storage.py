@@ -0,0 +1,90 @@
+"""
+Content-addressed storage for property images.
+
+Files are stored under their SHA-256: `properties/images/photo.jpg` is saved as
+`properties/images/3f/3f9a...c1.jpg`. Uploading bytes that are already stored
+writes nothing and returns the existing name, so the same photo used on many
+listings (or uploaded twice) takes one file on disk and one URL for CDNs.
+
+A stored file can therefore be shared by several rows, so it is only deleted
+once no Property references it any more (see release_files): on hard_delete()
+and when an image or its renditions are replaced. Soft-deleted rows keep their
+references, so their files stay.
+
+"No row references it" must also hold for transactions that have stored or
+picked a name but not committed yet, which a plain query cannot see. So every
+stored name has a PostgreSQL advisory lock: writers hold it shared from the
+moment they store (or reuse) the name until their transaction ends, and
+release_files holds it exclusively around its reference check and delete. A
+release therefore waits for in-flight writers and then sees their rows, and a
+writer that comes after a delete finds the file gone and stores it again.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+
+# Property columns holding names in image_storage.
+IMAGE_FIELDS = ('image', 'image_thumbnail', 'image_medium', 'image_webp')
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def lock_name(name, exclusive=False):
+    """
+    Take the advisory lock of a stored name until the current transaction ends
+    (shared for writers, exclusive for release_files). Outside a transaction it
+    is released straight away, so writers must run inside atomic().
+    """
+    key = int.from_bytes(hashlib.sha256(name.encode('utf-8')).digest()[:8], 'big', signed=True)
+    function = 'pg_advisory_xact_lock' if exclusive else 'pg_advisory_xact_lock_shared'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {function}(%s)', [key])
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and stores each content once."""
+
+    def _save(self, name, content):
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(posixpath.dirname(name), digest[:2], digest + extension)
+        lock_name(name)
+        if self.exists(name):
+            return name
+        content.seek(0)
+        return super()._save(name, content)
+
+
+image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return image_storage
+
+
+def release_files(model, names):
+    """
+    Delete the stored files in `names` ({field: name}) that no row of `model`
+    references any more. Runs after the current transaction commits, so a
+    rolled-back delete or replacement never loses a file.
+    """
+    names = {field: name for field, name in names.items() if name}
+    if not names:
+        return
+
+    def release():
+        for field, name in names.items():
+            with transaction.atomic():
+                lock_name(name, exclusive=True)
+                # Each kind of file only ever appears in its own column.
+                if not model._base_manager.filter(**{field: name}).exists():
+                    image_storage.delete(name)
+    transaction.on_commit(release)
@@ -1,12 +1,42 @@
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework import status
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
 from django.utils import timezone
 from datetime import timedelta
 from django.test import override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from io import BytesIO, StringIO
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
 
-from .models import Property
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework_simplejwt.tokens import AccessToken
+
+from interactions.models import Favorite, PaymentLog
+from messaging.models import Conversation, Message
+
+from .autocomplete import LocationIndex, rebuild_location_index, reset_location_index
+from .cache import listing_generation, popularity_generation, property_version
+from .fast_serializers import ValuesSerializer
+from .models import Property, PropertyImageUpload, PropertyImport, PropertyManager
+from .pagination import PropertyCursorPagination, PropertyPageNumberPagination
+from .serializers import PropertyListSerializer, PropertySerializer
+from .storage import image_storage
+from .uploads import read_image_size
 
 User = get_user_model()
 
@@ -157,3 +187,1512 @@ class PropertyTests(APITestCase):
             response3 = self.client.get(self.url_list + "?search=Addis")
             self.assertEqual(len(response3.data['results']), 1)
             self.assertEqual(response3.data['results'][0]['location'], 'Addis Ababa')
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=True)
+class PropertyVisibilityQuerySetTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="visowner", password="password123", role="OWNER")
+        self.other = User.objects.create_user(username="visother", password="password123", role="OWNER")
+        common = dict(description="D", house_type="Villa", location="Bole", price="100.00",
+                      bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+        self.paid = Property.objects.create(
+            owner=self.other, title="Paid", is_paid=True,
+            paid_until=timezone.now() + timedelta(days=3), **common
+        )
+        self.expired = Property.objects.create(
+            owner=self.other, title="Expired", is_paid=True,
+            paid_until=timezone.now() - timedelta(days=1), **common
+        )
+        self.mine_unpaid = Property.objects.create(owner=self.owner, title="Mine", **common)
+        self.deleted = Property.objects.create(
+            owner=self.owner, title="Deleted", is_paid=True,
+            paid_until=timezone.now() + timedelta(days=3), **common
+        )
+        self.deleted.delete()
+
+    def test_visible_only_returns_paid_unexpired_live_listings(self):
+        self.assertEqual(list(Property.objects.visible()), [self.paid])
+
+    def test_is_listed_follows_payment_fields_on_save(self):
+        self.assertTrue(self.paid.is_listed)
+        self.assertFalse(self.expired.is_listed)
+        self.expired.paid_until = timezone.now() + timedelta(days=1)
+        self.expired.save(update_fields=['paid_until'])
+        self.expired.refresh_from_db()
+        self.assertTrue(self.expired.is_listed)
+
+    def test_expire_listings_unlists_in_batches(self):
+        more = [
+            Property.objects.create(owner=self.other, title=f"Lapsing {i}", description="D", house_type="Villa",
+                                    location="Bole", price="100.00", bedrooms=1, bathrooms=1, max_guests=1,
+                                    amenities="WiFi", is_paid=True, paid_until=timezone.now() + timedelta(days=1))
+            for i in range(3)
+        ]
+        Property.objects.filter(pk__in=[p.pk for p in more]).update(paid_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(Property.objects.visible().count(), 4)
+
+        out = StringIO()
+        call_command('expire_listings', batch_size=2, stdout=out)
+        self.assertIn("Expired 3 listings", out.getvalue())
+        self.assertEqual(list(Property.objects.visible()), [self.paid])
+        self.assertTrue(Property.objects.get(pk=self.paid.pk).is_paid)
+
+    def test_expire_listings_leaves_listings_renewed_mid_sweep(self):
+        Property.objects.filter(pk=self.paid.pk).update(paid_until=timezone.now() - timedelta(seconds=1))
+        expired_listings = PropertyManager.expired_listings
+        calls = []
+
+        def renew_between_select_and_update(manager, now=None):
+            calls.append(now)
+            if len(calls) == 2:
+                # The owner pays after the sweeper picked the row but before it unlists it.
+                self.paid.paid_until = timezone.now() + timedelta(days=30)
+                self.paid.save(update_fields=['paid_until'])
+            return expired_listings(manager, now)
+
+        with mock.patch.object(PropertyManager, 'expired_listings', renew_between_select_and_update), \
+                mock.patch('properties.management.commands.expire_listings.bump_property_version') as bump:
+            out = StringIO()
+            call_command('expire_listings', stdout=out)
+        self.paid.refresh_from_db()
+        self.assertTrue(self.paid.is_listed)
+        self.assertEqual(list(Property.objects.visible()), [self.paid])
+        self.assertNotIn("Expired", out.getvalue())
+        bump.assert_not_called()
+
+    def test_visible_to_adds_the_owners_own_listings(self):
+        ids = set(Property.objects.visible_to(self.owner).values_list('id', flat=True))
+        self.assertEqual(ids, {self.paid.id, self.mine_unpaid.id})
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyFullTextSearchTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="searchowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, house_type="Villa", bedrooms=2, bathrooms=1, max_guests=2, amenities="WiFi")
+        self.title_hit = Property.objects.create(
+            title="Garden villa", description="Quiet street", location="Sarbet", price="900.00", **common
+        )
+        self.description_hit = Property.objects.create(
+            title="Family house", description="Large garden and terrace", location="Bole", price="500.00", **common
+        )
+        Property.objects.create(
+            title="City condo", description="Top floor", location="Piassa", price="700.00", **common
+        )
+        self.url = '/api/properties/'
+
+    def test_search_ranks_title_matches_above_description_matches(self):
+        response = self.client.get(self.url + "?search=garden")
+        titles = [row['title'] for row in response.data['results']]
+        self.assertEqual(titles, ["Garden villa", "Family house"])
+
+    def test_search_combines_with_filters_and_ordering(self):
+        response = self.client.get(self.url + "?search=garden&max_price=1000&ordering=price")
+        titles = [row['title'] for row in response.data['results']]
+        self.assertEqual(titles, ["Family house", "Garden villa"])
+
+        response = self.client.get(self.url + "?search=garden -terrace")
+        self.assertEqual([row['title'] for row in response.data['results']], ["Garden villa"])
+
+    def test_search_vector_follows_edits_and_backfill(self):
+        self.title_hit.title = "Rooftop villa"
+        self.title_hit.save()
+        response = self.client.get(self.url + "?search=rooftop")
+        self.assertEqual(len(response.data['results']), 1)
+
+        Property.objects.update(search_vector=None)
+        call_command('rebuild_search_vectors', stdout=StringIO())
+        response = self.client.get(self.url + "?search=garden")
+        self.assertEqual(len(response.data['results']), 1)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyLocationMatchingTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="trgmowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, description="D", house_type="Condo", price="100.00",
+                      bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+        for location in ("Bole", "Bole Medhanialem", "Bole", "Piassa"):
+            Property.objects.create(title=f"Home in {location}", location=location, **common)
+        self.url = '/api/properties/'
+
+    def test_contains_is_the_default_location_match(self):
+        response = self.client.get(self.url + "?location=bole")
+        self.assertEqual(response.data['count'], 3)
+        response = self.client.get(self.url + "?location=Boley")
+        self.assertEqual(response.data['count'], 0)
+
+    def test_fuzzy_location_match_tolerates_misspellings(self):
+        response = self.client.get(self.url + "?location=Boley&location_match=fuzzy")
+        locations = {row['location'] for row in response.data['results']}
+        self.assertEqual(locations, {"Bole", "Bole Medhanialem"})
+
+    def test_location_suggestions(self):
+        response = self.client.get(self.url + "locations/suggest/?q=Boley")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        suggestions = response.data['suggestions']
+        self.assertEqual(suggestions[0]['location'], "Bole")
+        self.assertEqual(suggestions[0]['listings'], 2)
+        self.assertNotIn("Piassa", [s['location'] for s in suggestions])
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyAmenityFilterTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="amenityowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, description="D", house_type="House", location="Bole",
+                      price="100.00", bedrooms=1, bathrooms=1, max_guests=1)
+        self.both = Property.objects.create(title="Both", amenities="WiFi, Parking", **common)
+        self.wifi = Property.objects.create(title="WiFi only", amenities=" wifi ,Pool", **common)
+        self.none = Property.objects.create(title="Nothing", amenities="Gym", **common)
+        self.url = '/api/properties/'
+
+    def titles(self, query):
+        return {row['title'] for row in self.client.get(self.url + query).data['results']}
+
+    def test_amenities_are_normalised_into_tags(self):
+        self.assertEqual(self.wifi.amenity_tags, ['wifi', 'pool'])
+        self.wifi.amenities = "Pool, Garden"
+        self.wifi.save(update_fields=['amenities'])
+        self.wifi.refresh_from_db()
+        self.assertEqual(self.wifi.amenity_tags, ['pool', 'garden'])
+
+    def test_amenities_all_requires_every_tag(self):
+        self.assertEqual(self.titles("?amenities_all=wifi,parking"), {"Both"})
+        self.assertEqual(self.titles("?amenities_all=WiFi"), {"Both", "WiFi only"})
+
+    def test_amenities_any_matches_at_least_one_tag(self):
+        self.assertEqual(self.titles("?amenities_any=parking,gym"), {"Both", "Nothing"})
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyCursorPaginationTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="cursorowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, description="D", house_type="House", location="Bole",
+                      bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+        # 25 rows with heavily repeated prices, so the id tiebreaker matters.
+        for i in range(25):
+            Property.objects.create(title=f"Home {i}", price=f"{100 * (i % 4) + 100}.00", **common)
+        self.url = '/api/properties/'
+
+    def walk(self, url):
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url, pages = response.data['next'], pages + 1
+        return seen, pages
+
+    def test_every_ordering_visits_each_row_exactly_once_in_order(self):
+        for ordering in ('price', '-price', 'created_at', '-created_at'):
+            seen, pages = self.walk(f"{self.url}?pagination=cursor&ordering={ordering}")
+            expected = list(
+                Property.objects.order_by(ordering, ('-' if ordering.startswith('-') else '') + 'id')
+                .values_list('id', flat=True)
+            )
+            self.assertEqual(seen, expected, ordering)
+            self.assertEqual(pages, 3)
+
+    def test_previous_link_returns_the_preceding_page(self):
+        first = self.client.get(f"{self.url}?pagination=cursor&ordering=price")
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']],
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_cursor_is_rejected_when_ordering_changes(self):
+        first = self.client.get(f"{self.url}?pagination=cursor&ordering=price")
+        cursor = first.data['next'].split('cursor=')[1]
+        response = self.client.get(f"{self.url}?cursor={cursor}&ordering=-created_at")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_orderings_without_a_keyset_are_rejected(self):
+        for ordering in ('distance', 'title', 'price,-created_at'):
+            response = self.client.get(f"{self.url}?near=9,38&pagination=cursor&ordering={ordering}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, ordering)
+            self.assertIn('ordering', response.data)
+        self.assertEqual(self.client.get(f"{self.url}?near=9,38&ordering=distance").status_code, status.HTTP_200_OK)
+
+    def test_page_number_mode_is_still_the_default(self):
+        response = self.client.get(self.url + "?page=3")
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyEstimatedCountTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="countowner", password="password123", role="OWNER")
+        for i in range(25):
+            Property.objects.create(
+                owner=self.owner, title=f"Home {i}", description="D", house_type="House", location="Bole",
+                price="100.00", bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi",
+            )
+        self.url = '/api/properties/'
+
+    def test_small_result_sets_are_counted_exactly(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 25)
+        self.assertFalse(response.data['approximate'])
+
+    @override_settings(PROPERTY_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_large_result_sets_use_the_planner_estimate(self):
+        response = self.client.get(self.url + "?page=2")
+        self.assertTrue(response.data['approximate'])
+        self.assertIsNotNone(response.data['next'])
+
+        # Pages are served from real rows, whatever the estimate says.
+        response = self.client.get(self.url + "?page=3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(self.client.get(self.url + "?page=4").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_counts_are_cached_until_the_next_write(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url + "?page=2")
+        self.assertEqual(response.data['count'], 25)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        Property.objects.first().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 24)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyGeoSearchTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="geoowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, description="D", house_type="House", price="100.00",
+                      bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+        # Meskel Square, ~2.3 km east of it (Bole), ~3.7 km north-west of it (Piassa), and one with no coordinates.
+        Property.objects.create(title="Meskel", location="Meskel", latitude="9.010800", longitude="38.761300", **common)
+        Property.objects.create(title="Bole", location="Bole", latitude="9.005000", longitude="38.782000", **common)
+        Property.objects.create(title="Piassa", location="Piassa", latitude="9.040000", longitude="38.745000", **common)
+        Property.objects.create(title="Nowhere", location="Unknown", **common)
+        self.url = '/api/properties/'
+
+    def titles(self, query):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [row['title'] for row in response.data['results']]
+
+    def test_near_with_radius_returns_points_inside_the_circle_nearest_first(self):
+        self.assertEqual(self.titles("?near=9.0108,38.7613&radius_km=3"), ["Meskel", "Bole"])
+        self.assertEqual(self.titles("?near=9.0108,38.7613&radius_km=10"), ["Meskel", "Bole", "Piassa"])
+
+    def test_near_without_radius_sorts_by_distance(self):
+        self.assertEqual(self.titles("?near=9.04,38.745"), ["Piassa", "Meskel", "Bole"])
+        self.assertEqual(self.titles("?near=9.04,38.745&ordering=-distance"), ["Bole", "Meskel", "Piassa"])
+
+    def test_bbox_restricts_to_the_viewport(self):
+        self.assertEqual(set(self.titles("?bbox=38.75,9.0,38.77,9.02")), {"Meskel"})
+
+    def test_distance_ordering_without_near_is_ignored(self):
+        self.assertEqual(len(self.titles("?ordering=distance")), 4)
+
+    def test_malformed_coordinates_are_rejected(self):
+        self.assertEqual(self.client.get(self.url + "?near=9.01").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url + "?bbox=1,2,3").status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyClusterTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="clusterowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, description="D", house_type="House",
+                      bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+        # Two listings a few hundred metres apart in Bole, one in Piassa.
+        Property.objects.create(title="Bole 1", location="Bole", price="100.00", latitude="9.005000", longitude="38.782000", **common)
+        Property.objects.create(title="Bole 2", location="Bole", price="300.00", latitude="9.006000", longitude="38.784000", **common)
+        self.piassa = Property.objects.create(title="Piassa", location="Piassa", price="50.00", latitude="9.040000", longitude="38.745000", **common)
+        self.url = '/api/properties/clusters/'
+
+    def clusters(self, query):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return sorted(response.data['clusters'], key=lambda c: -c['count'])
+
+    def test_nearby_listings_share_a_cluster_at_city_zoom(self):
+        bole, piassa = self.clusters("?zoom=11&bbox=38.70,8.95,38.85,9.10")
+        self.assertEqual(bole['count'], 2)
+        self.assertEqual((bole['min_price'], bole['max_price']), ("100.00", "300.00"))
+        self.assertAlmostEqual(bole['latitude'], 9.0055)
+        self.assertIsNone(bole['property_id'])
+        self.assertEqual(piassa['count'], 1)
+        self.assertEqual(piassa['property_id'], self.piassa.id)
+
+    def test_zooming_out_merges_clusters(self):
+        clusters = self.clusters("?zoom=4&bbox=38.70,8.95,38.85,9.10")
+        self.assertEqual([c['count'] for c in clusters], [3])
+
+    def test_list_filters_apply(self):
+        clusters = self.clusters("?zoom=4&bbox=38.70,8.95,38.85,9.10&max_price=100")
+        self.assertEqual([c['count'] for c in clusters], [2])
+
+    def test_tiles_are_cached_until_the_next_write(self):
+        query = "?zoom=11&bbox=38.70,8.95,38.85,9.10"
+        self.clusters(query)
+        with self.assertNumQueries(0):
+            self.clusters(query)
+        self.piassa.delete()
+        self.assertEqual([c['count'] for c in self.clusters(query)], [2])
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ("?bbox=38.70,8.95,38.85,9.10", "?zoom=25&bbox=38.70,8.95,38.85,9.10",
+                      "?zoom=11&bbox=1,2,3", "?zoom=20&bbox=38.0,8.0,39.0,9.0"):
+            self.assertEqual(self.client.get(self.url + query).status_code, status.HTTP_400_BAD_REQUEST, query)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=True, PROPERTY_CACHE_TTL=60)
+class PropertyResponseCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="cacheowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, description="D", house_type="House", price="100.00",
+                      bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+        self.paid = Property.objects.create(title="Paid", location="Bole", is_paid=True,
+                                            paid_until=timezone.now() + timedelta(days=5), **common)
+        self.unpaid = Property.objects.create(title="Unpaid", location="Bole", **common)
+        self.url = '/api/properties/'
+
+    def titles(self):
+        return [row['title'] for row in self.client.get(self.url).data['results']]
+
+    def test_anonymous_list_and_detail_are_served_from_cache(self):
+        self.titles()
+        self.client.get(f"{self.url}{self.paid.id}/")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(), ["Paid"])
+            self.assertEqual(self.client.get(f"{self.url}{self.paid.id}/").data['title'], "Paid")
+
+    def test_owner_and_public_responses_are_cached_separately(self):
+        self.assertEqual(self.titles(), ["Paid"])
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(set(self.titles()), {"Paid", "Unpaid"})
+
+    def test_payment_and_soft_delete_invalidate(self):
+        self.assertEqual(self.titles(), ["Paid"])
+        self.client.force_authenticate(user=self.owner)
+        self.client.post('/api/interactions/payments/pay/', {'property_id': self.unpaid.id})
+        self.client.force_authenticate(user=None)
+        self.assertEqual(set(self.titles()), {"Paid", "Unpaid"})
+
+        self.client.get(f"{self.url}{self.paid.id}/")
+        self.paid.delete()
+        self.assertEqual(self.client.get(f"{self.url}{self.paid.id}/").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.titles(), ["Unpaid"])
+
+    def test_writes_invalidate_again_once_committed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.paid.title = "Renamed"
+            self.paid.save()
+            Property.objects.filter(pk=self.unpaid.pk).add_to_counter('favorite_count', 1)
+            # Another connection reading now would still get the old rows, cached under these keys.
+            generations = listing_generation(), popularity_generation(), property_version(self.paid.pk)
+        for callback in callbacks:
+            callback()
+        after = listing_generation(), popularity_generation(), property_version(self.paid.pk)
+        self.assertTrue(all(new != old for new, old in zip(after, generations)), (generations, after))
+
+    def test_detail_cache_key_uses_the_numeric_pk(self):
+        self.assertEqual(self.client.get(f"{self.url}0{self.paid.id}/").data['title'], "Paid")
+        self.paid.title = "Renamed"
+        self.paid.save()
+        self.assertEqual(self.client.get(f"{self.url}0{self.paid.id}/").data['title'], "Renamed")
+
+    def test_editing_one_property_keeps_other_details_cached(self):
+        self.client.get(f"{self.url}{self.paid.id}/")
+        self.unpaid.title = "Renamed"
+        self.unpaid.save()
+        with self.assertNumQueries(0):
+            self.client.get(f"{self.url}{self.paid.id}/")
+
+    def test_expiry_sweep_invalidates(self):
+        self.client.get(f"{self.url}{self.paid.id}/")
+        self.assertEqual(self.titles(), ["Paid"])
+        Property.objects.filter(pk=self.paid.pk).update(paid_until=timezone.now() - timedelta(minutes=1))
+        call_command('expire_listings', stdout=StringIO())
+        self.assertEqual(self.titles(), [])
+        self.assertEqual(self.client.get(f"{self.url}{self.paid.id}/").status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="etagowner", password="password123", role="OWNER")
+        self.common = dict(owner=self.owner, description="D", house_type="House", price="100.00",
+                           bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+        self.property = Property.objects.create(title="Flat", location="Bole", **self.common)
+        self.url = '/api/properties/'
+        self.detail_url = f"{self.url}{self.property.id}/"
+
+    def test_detail_revalidates_with_etag_and_last_modified(self):
+        response = self.client.get(self.detail_url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Property.objects.filter(pk=self.property.pk).update(is_paid=True)
+        cache.clear()
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_detail_304_skips_serialization(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with override_settings(PROPERTY_CACHE_TTL=0):
+            with self.assertNumQueries(1):
+                response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_when_the_filtered_set_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotEqual(self.client.get(self.url + "?max_price=50")['ETag'], etag)
+
+        self.property.delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    @override_settings(REQUIRE_LISTING_PAYMENT=True, PROPERTY_CACHE_TTL=0, PROPERTY_COUNT_CACHE_TTL=0)
+    @mock.patch.object(PropertyPageNumberPagination, 'page_size', 1)
+    @mock.patch.object(PropertyCursorPagination, 'page_size', 1)
+    def test_list_etag_changes_when_a_row_off_the_page_expires(self):
+        paid = dict(location="Bole", is_paid=True, paid_until=timezone.now() + timedelta(days=5), **self.common)
+        older = Property.objects.create(title="Older", **paid)
+        Property.objects.create(title="Newer", **paid)
+        urls = [self.url + '?ordering=-created_at', self.url + '?ordering=-created_at&pagination=cursor']
+        etags = [self.client.get(url)['ETag'] for url in urls]
+
+        # Swept by another process: this one's listing generation does not move.
+        Property.objects.filter(pk=older.pk).update(paid_until=timezone.now() - timedelta(minutes=1))
+        with mock.patch('properties.management.commands.expire_listings.bump_listing_generation'):
+            call_command('expire_listings', stdout=StringIO())
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertEqual([row['title'] for row in response.data['results']], ["Newer"])
+
+    @override_settings(PROPERTY_CACHE_TTL=0, PROPERTY_COUNT_CACHE_TTL=0)
+    def test_list_etag_reuses_the_page_query(self):
+        for pagination, counts in (('?pagination=cursor', 0), ('', 1)):
+            etag = self.client.get(self.url + pagination)['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url + pagination, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            sql = [query['sql'].upper() for query in queries]
+            self.assertEqual(sum('COUNT(' in query for query in sql), counts, sql)
+            self.assertFalse(any('MAX(' in query for query in sql), sql)
+
+        # A listing whose row changed without a new generation still gets a fresh tag.
+        Property.objects.filter(pk=self.property.pk).update(updated_at=timezone.now())
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertySparseFieldsTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="sparseowner", password="password123", role="OWNER")
+        for i in range(3):
+            Property.objects.create(
+                owner=self.owner, title=f"Home {i}", description="A long description", house_type="House",
+                location="Bole", price="100.00", bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi, Parking",
+            )
+        self.url = '/api/properties/'
+
+    def test_list_uses_the_compact_representation(self):
+        row = self.client.get(self.url).data['results'][0]
+        self.assertIn('title', row)
+        self.assertEqual(row['owner'], self.owner.id)
+        for name in ('description', 'amenities', 'amenity_tags'):
+            self.assertNotIn(name, row)
+
+    def test_fields_and_omit(self):
+        row = self.client.get(self.url + "?fields=id,title,description").data['results'][0]
+        self.assertEqual(set(row), {'id', 'title', 'description'})
+        row = self.client.get(self.url + "?omit=image,latitude,longitude").data['results'][0]
+        self.assertNotIn('image', row)
+        self.assertIn('price', row)
+
+        detail = self.client.get(f"{self.url}{Property.objects.first().id}/?fields=title,amenity_tags").data
+        self.assertEqual(detail, {'title': 'Home 0', 'amenity_tags': ['wifi', 'parking']})
+
+    def test_unused_text_columns_are_not_selected(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url + "?pagination=cursor")
+        selects = [q['sql'] for q in queries.captured_queries if 'ORDER BY' in q['sql']]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNotIn('"description"', sql)
+            self.assertNotIn('"amenities"', sql)
+        # One query for the page; owner ids come from the row itself.
+        self.assertEqual(len(selects), 1)
+
+
+class PropertyValuesSerializerTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="fastowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, description="D", house_type="Villa", location="Bole",
+                      bedrooms=2, bathrooms="1.5", max_guests=4, amenities="WiFi, Pool")
+        Property.objects.create(title="Full", price="1234.50", floor_number=3, latitude="9.010800",
+                                longitude="38.761300", image="properties/images/front.jpg", is_paid=True,
+                                paid_until=timezone.now() + timedelta(days=3), **common)
+        Property.objects.create(title="Sparse", price="99.00", **common)
+
+    def test_output_is_byte_identical_to_the_serializers(self):
+        request = Request(APIRequestFactory().get('/api/properties/'))
+        queryset = Property.objects.order_by('id')
+        for serializer_class, kwargs in ((PropertySerializer, {}), (PropertyListSerializer, {}),
+                                         (PropertySerializer, {'fields': ['id', 'image', 'price']})):
+            expected = serializer_class(queryset, many=True, context={'request': request}, **kwargs).data
+            rows = ValuesSerializer(serializer_class(context={'request': request}, **kwargs))
+            self.assertTrue(rows.supported)
+            actual = rows.serialize(queryset.values(*rows.columns))
+            self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyFacetTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="facetowner", password="password123", role="OWNER")
+        common = dict(owner=self.owner, description="D", location="Bole", bathrooms=1, max_guests=1, amenities="WiFi")
+        Property.objects.create(title="Garden villa", house_type="Villa", price="30000.00", bedrooms=5, **common)
+        Property.objects.create(title="Garden condo", house_type="Condo", price="900.00", bedrooms=1, **common)
+        Property.objects.create(title="Studio", house_type="Condo", price="2500.00", bedrooms=0,
+                                is_available=False, **common)
+        self.url = '/api/properties/facets/'
+
+    def counts(self, data, facet, key='value'):
+        return {entry[key]: entry['count'] for entry in data[facet]}
+
+    def test_all_facets_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url).data
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(self.counts(data, 'house_type'), {'Condo': 2, 'Villa': 1, 'Apartment': 0, 'House': 0})
+        bedrooms = self.counts(data, 'bedrooms', key='label')
+        self.assertEqual((bedrooms['0'], bedrooms['1'], bedrooms['5+']), (1, 1, 1))
+        prices = {entry['min']: entry['count'] for entry in data['price']}
+        self.assertEqual((prices[0], prices[2500], prices[25000], prices[50000]), (1, 1, 1, 0))
+        self.assertEqual(self.counts(data, 'is_available'), {True: 2, False: 1})
+
+    def test_filters_and_search_apply_and_results_are_cached(self):
+        data = self.client.get(self.url + "?search=garden&max_price=5000").data
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(self.counts(data, 'house_type')['Condo'], 1)
+        with self.assertNumQueries(0):
+            self.client.get(self.url + "?max_price=5000&search=garden")
+
+
+def make_image(size=(1600, 1200), image_format='JPEG', name='photo.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False, PROPERTY_IMAGE_PROCESSING_SYNC=True)
+class PropertyImageRenditionTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username="imageowner", password="password123", role="OWNER")
+        self.client.force_authenticate(user=self.owner)
+        self.data = dict(title="Photo flat", description="D", house_type="Condo", location="Bole",
+                         price="100.00", bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+
+    def test_upload_renders_renditions_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/properties/', {**self.data, 'image': make_image()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertIsNone(response.data['image_thumbnail'])
+
+        prop = Property.objects.get(pk=response.data['id'])
+        with Image.open(prop.image_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 240))
+        with Image.open(prop.image_medium.path) as medium:
+            self.assertEqual(medium.size, (1280, 960))
+        with Image.open(prop.image_webp.path) as webp:
+            self.assertEqual(webp.format, 'WEBP')
+
+        row = self.client.get('/api/properties/').data['results'][0]
+        self.assertIn('/properties/renditions/', row['image_thumbnail'])
+        self.assertTrue(row['image_thumbnail'].endswith('.jpg'))
+        self.assertNotIn('image_medium', row)
+        self.assertTrue(self.client.get(f"/api/properties/{prop.pk}/").data['image_webp'].endswith('.webp'))
+
+    def test_replacing_the_image_clears_stale_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            prop = Property.objects.create(owner=self.owner, image=make_image(), **self.data)
+        prop.refresh_from_db()
+        self.assertTrue(prop.image_thumbnail)
+        prop.image = make_image(name='other.jpg')
+        prop.save()
+        self.assertFalse(Property.objects.get(pk=prop.pk).image_thumbnail)
+
+    def test_backfill_command(self):
+        # on_commit callbacks are not run here, as if the worker had never picked the job up.
+        prop = Property.objects.create(owner=self.owner, image=make_image(), **self.data)
+        Property.objects.create(owner=self.owner, **self.data)
+        out = StringIO()
+        call_command('generate_image_renditions', workers=1, stdout=out)
+        self.assertIn("Rendered images for 1 properties", out.getvalue())
+        prop.refresh_from_db()
+        self.assertTrue(prop.image_thumbnail.name.startswith('properties/renditions/'))
+
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False, PROPERTY_IMAGE_PROCESSING_SYNC=True)
+class PropertyImageStorageTests(APITestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username="storageowner", password="password123", role="OWNER")
+        self.data = dict(owner=self.owner, title="Stored flat", description="D", house_type="Condo",
+                         location="Bole", price="100.00", bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+
+    def create(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            prop = Property.objects.create(image=image, **self.data)
+        prop.refresh_from_db()
+        return prop
+
+    def stored(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_identical_uploads_share_one_file(self):
+        content = make_image().read()
+        first = self.create(SimpleUploadedFile('a.jpg', content))
+        second = self.create(SimpleUploadedFile('b.JPG', content))
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first.image.name, f'properties/images/{digest[:2]}/{digest}.jpg')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.image_thumbnail.name, first.image_thumbnail.name)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'properties/images', digest[:2])), [f'{digest}.jpg'])
+
+    def test_files_are_deleted_with_their_last_reference(self):
+        content = make_image().read()
+        first = self.create(SimpleUploadedFile('a.jpg', content))
+        second = self.create(SimpleUploadedFile('b.jpg', content))
+        names = [first.image.name, first.image_thumbnail.name, first.image_webp.name]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            second.hard_delete()
+        # The soft-deleted row still references them.
+        self.assertTrue(all(self.stored(name) for name in names))
+        with self.captureOnCommitCallbacks(execute=True):
+            first.hard_delete()
+        self.assertFalse(any(self.stored(name) for name in names))
+
+    def test_stored_names_stay_locked_until_the_writer_commits(self):
+        name = image_storage.save('properties/images/a.jpg', make_image())
+        key = int.from_bytes(hashlib.sha256(name.encode('utf-8')).digest()[:8], 'big', signed=True)
+        acquired = []
+
+        def try_exclusive_lock():
+            # What release_files() needs; a separate connection, as another process would use.
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_try_advisory_lock(%s)', [key])
+                    acquired.append(cursor.fetchone()[0])
+                    if acquired[-1]:
+                        cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+            finally:
+                connection.close()
+
+        # The test's transaction is still open, so the name saved above is still held.
+        thread = threading.Thread(target=try_exclusive_lock)
+        thread.start()
+        thread.join()
+        self.assertEqual(acquired, [False])
+
+    def test_replacing_an_image_releases_the_old_files(self):
+        prop = self.create(make_image())
+        old = [prop.image.name, prop.image_medium.name]
+        prop.image = make_image(size=(800, 600), name='new.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            prop.save()
+        prop.refresh_from_db()
+        self.assertTrue(self.stored(prop.image.name))
+        self.assertTrue(self.stored(prop.image_medium.name))
+        self.assertFalse(any(self.stored(name) for name in old))
+
+    def picture(self, size, image_format, name):
+        buffer = BytesIO()
+        Image.effect_mandelbrot(size, (-2, -1.5, 1, 1.5), 100).convert('RGB').save(buffer, image_format)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    @override_settings(PROPERTY_IMAGE_PERCEPTUAL_DEDUP=True)
+    def test_perceptual_duplicate_reuses_the_stored_image(self):
+        original = self.create(self.picture((800, 600), 'PNG', 'original.png'))
+        self.assertIsNotNone(original.image_phash)
+        copy = self.create(self.picture((400, 300), 'JPEG', 'copy.jpg'))
+        self.assertEqual(copy.image.name, original.image.name)
+        different = self.create(make_image(name='plain.jpg'))
+        self.assertNotEqual(different.image.name, original.image.name)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False, PROPERTY_IMAGE_MAX_UPLOAD_SIZE=64 * 1024,
+                   PROPERTY_IMAGE_MAX_DIMENSION=2000)
+class PropertyImageUploadTests(APITestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username="uploader", password="password123", role="OWNER")
+        self.client.force_authenticate(user=self.owner)
+        self.data = dict(title="Upload flat", description="D", house_type="Condo", location="Bole",
+                         price="100.00", bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+
+    def post_image(self, image):
+        return self.client.post('/api/properties/', {**self.data, 'image': image}, format='multipart')
+
+    def test_reads_dimensions_from_the_header(self):
+        for image_format in ('JPEG', 'PNG', 'GIF', 'WEBP'):
+            data = make_image(size=(321, 123), image_format=image_format).read()
+            self.assertEqual(read_image_size(data[:4096]), (image_format, 321, 123))
+
+    def test_oversized_upload_is_rejected(self):
+        # A valid header, so it is the byte count that stops the upload part-way.
+        padded = make_image(size=(200, 150)).read() + os.urandom(200 * 1024)
+        response = self.post_image(SimpleUploadedFile('big.jpg', padded, content_type='image/jpeg'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("upload limit", str(response.data))
+        self.assertFalse(Property.objects.exists())
+
+    def test_non_image_is_rejected(self):
+        response = self.post_image(SimpleUploadedFile('notes.jpg', b'just some text' * 10, content_type='image/jpeg'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Unsupported image type", str(response.data))
+
+    def test_over_dimension_image_is_rejected(self):
+        response = self.post_image(make_image(size=(2400, 100), image_format='PNG', name='wide.png'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("2400x100", str(response.data))
+
+    def test_small_image_is_accepted(self):
+        response = self.post_image(make_image(size=(200, 150)))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+    def put_chunk(self, upload_id, offset, chunk):
+        return self.client.put(f'/api/properties/uploads/{upload_id}/', chunk,
+                               content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunked_upload_resumes_and_attaches_to_property(self):
+        content = make_image(size=(1600, 1200), image_format='PNG', name='large.png').read()
+        response = self.client.post('/api/properties/uploads/', {'filename': '../large.png', 'size': len(content)})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        upload_id = response.data['id']
+        self.assertEqual(response.data['filename'], 'large.png')
+
+        half = len(content) // 2
+        self.assertEqual(self.put_chunk(upload_id, 0, content[:half]).data['offset'], half)
+        # A retried chunk at a stale offset is refused with the offset to resume from.
+        conflict = self.put_chunk(upload_id, 0, content[:half])
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(conflict.data['offset'], half)
+        done = self.put_chunk(upload_id, half, content[half:])
+        self.assertTrue(done.data['completed'])
+
+        other = User.objects.create_user(username="other", password="password123", role="OWNER")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(f'/api/properties/uploads/{upload_id}/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.post('/api/properties/', {**self.data, 'image_upload': upload_id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        prop = Property.objects.get(pk=response.data['id'])
+        with open(prop.image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertFalse(PropertyImageUpload.objects.exists())
+        self.assertFalse(os.listdir(os.path.join(self.media_root, PropertyImageUpload.PARTIAL_DIR)))
+
+    def test_chunked_upload_checks_the_header(self):
+        upload_id = self.client.post('/api/properties/uploads/', {'filename': 'a.jpg', 'size': 1000}).data['id']
+        response = self.put_chunk(upload_id, 0, b'not an image' * 10)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PropertyImageUpload.objects.filter(pk=upload_id).exists())
+
+    @override_settings(PROPERTY_IMAGE_CHUNKED_MAX_SIZE=1024)
+    def test_chunked_upload_size_is_capped(self):
+        response = self.client.post('/api/properties/uploads/', {'filename': 'a.jpg', 'size': 4096})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PROPERTY_IMAGE_MAX_OPEN_UPLOADS=2)
+    def test_open_uploads_per_user_are_capped(self):
+        ids = [self.client.post('/api/properties/uploads/', {'filename': 'a.jpg', 'size': 100}).data['id']
+               for _ in range(2)]
+        response = self.client.post('/api/properties/uploads/', {'filename': 'a.jpg', 'size': 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("At most 2 uploads", str(response.data))
+        # Abandoned uploads no longer count, and can no longer be used.
+        PropertyImageUpload.objects.filter(pk=ids[0]).update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(self.put_chunk(ids[0], 0, b'x').status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post('/api/properties/uploads/', {'filename': 'a.jpg', 'size': 100})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_expire_command_removes_abandoned_uploads(self):
+        content = make_image(size=(200, 150)).read()
+        ids = [self.client.post('/api/properties/uploads/', {'filename': 'a.jpg', 'size': len(content)}).data['id']
+               for _ in range(3)]
+        for upload_id in ids:
+            self.put_chunk(upload_id, 0, content[:100])
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, PropertyImageUpload.PARTIAL_DIR))), 3)
+        PropertyImageUpload.objects.filter(pk__in=ids[:2]).update(updated_at=timezone.now() - timedelta(days=2))
+        response = self.client.post('/api/properties/', {**self.data, 'image_upload': ids[0]})
+        self.assertIn('image_upload', response.data)
+
+        out = StringIO()
+        call_command('expire_image_uploads', batch_size=1, stdout=out)
+        self.assertIn("Removed 2 abandoned uploads.", out.getvalue())
+        self.assertEqual([str(pk) for pk in PropertyImageUpload.objects.values_list('pk', flat=True)], [ids[2]])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, PropertyImageUpload.PARTIAL_DIR)),
+                         [f'{ids[2]}.part'])
+
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False)
+class PropertyBulkTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.url = '/api/properties/bulk/'
+        self.tenant = User.objects.create_user(username="agency", password="password123", role="TENANT")
+        self.client.force_authenticate(user=self.tenant)
+
+    def item(self, n, **overrides):
+        return {"title": f"Unit {n}", "description": "Sea view", "house_type": "Apartment",
+                "location": "Bole", "price": "100.00", "bedrooms": 2, "bathrooms": 1, "max_guests": 3,
+                "amenities": "WiFi, Pool", **overrides}
+
+    def test_bulk_create_writes_all_items_with_derived_fields(self):
+        generation = listing_generation()
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, [self.item(n) for n in range(20)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(Property.objects.filter(owner=self.tenant).count(), 20)
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.role, 'OWNER')
+        self.assertNotEqual(listing_generation(), generation)
+
+        prop = Property.objects.get(pk=response.data[0]['id'])
+        self.assertEqual(prop.amenity_tags, ['wifi', 'pool'])
+        self.assertEqual(Property.objects.filter(search_vector=SearchQuery('sea')).count(), 20)
+
+    def test_bulk_create_reports_errors_per_item_and_writes_nothing(self):
+        response = self.client.post(self.url, [self.item(1), self.item(2, price="-5"), self.item(3)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data), [1])
+        self.assertIn('price', response.data[1])
+        self.assertFalse(Property.objects.exists())
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.role, 'TENANT')
+
+    @override_settings(PROPERTY_BULK_MAX_ITEMS=2)
+    def test_bulk_size_is_capped(self):
+        response = self.client.post(self.url, [self.item(n) for n in range(3)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        ids = [item['id'] for item in self.client.post(self.url, [self.item(n) for n in range(3)], format='json').data]
+        other = Property.objects.create(owner=User.objects.create_user(username="rival", password="password123"),
+                                        **self.item(9))
+        before = Property.objects.get(pk=ids[0]).updated_at
+
+        response = self.client.patch(self.url, [{"id": ids[0], "price": "-1"}, {"id": other.pk, "price": "5"}],
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price', response.data[0])
+        self.assertEqual(response.data[1], {'id': ["Not found."]})
+        self.assertEqual(Property.objects.get(pk=ids[0]).price, 100)
+
+        response = self.client.patch(self.url, [{"id": ids[0], "amenities": "Garden"},
+                                                {"id": ids[1], "title": "Penthouse", "price": "250.00"}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        first, second = Property.objects.get(pk=ids[0]), Property.objects.get(pk=ids[1])
+        self.assertEqual(first.amenity_tags, ['garden'])
+        self.assertGreater(first.updated_at, before)
+        self.assertEqual(str(second.price), '250.00')
+        self.assertEqual(Property.objects.filter(search_vector=SearchQuery('penthouse')).get().pk, ids[1])
+        self.assertEqual(Property.objects.get(pk=ids[2]).title, "Unit 2")
+
+    def test_bulk_update_locks_rows_and_rejects_duplicate_ids(self):
+        ids = [item['id'] for item in self.client.post(self.url, [self.item(n) for n in range(2)], format='json').data]
+        response = self.client.patch(self.url, [{"id": ids[0], "price": "5"}, {"id": ids[0], "price": "6"}],
+                                     format='json')
+        self.assertEqual(response.data, {0: {'id': ["Duplicate id."]}, 1: {'id': ["Duplicate id."]}})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch(self.url, [{"id": ids[0], "price": "5"}, {"id": ids[1], "price": "6"}], format='json')
+        [read] = [query['sql'] for query in queries if query['sql'].startswith('SELECT')
+                  and 'properties_property' in query['sql'].split(' WHERE ')[0]]
+        self.assertIn('FOR UPDATE', read)
+
+
+@override_settings(MEDIA_ACCEL='', MEDIA_MAX_AGE=600, REQUIRE_LISTING_PAYMENT=True)
+class MediaServingTests(APITestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        for name in ('properties/images/ab/abc.jpg', 'properties/renditions/cd/cde.webp',
+                     'properties/images/ef/efg.jpg', 'uploads/partial/x.part'):
+            os.makedirs(os.path.dirname(os.path.join(self.media_root, name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), 'wb') as handle:
+                handle.write(b'0123456789')
+        self.owner = User.objects.create_user(username="mediaowner", password="password123", role="OWNER")
+        base = dict(owner=self.owner, description="D", house_type="Condo", location="Bole", price=100,
+                    bedrooms=1, bathrooms=1, max_guests=1, amenities="WiFi")
+        self.listed = Property.objects.create(title="Listed", is_paid=True,
+                                              paid_until=timezone.now() + timedelta(days=5), **base)
+        self.unpaid = Property.objects.create(title="Unpaid", **base)
+        # Names set directly: the files above stand in for stored content.
+        Property.objects.filter(pk=self.listed.pk).update(
+            image='properties/images/ab/abc.jpg', image_webp='properties/renditions/cd/cde.webp',
+        )
+        Property.objects.filter(pk=self.unpaid.pk).update(image='properties/images/ef/efg.jpg')
+        self.url = '/media/properties/images/ab/abc.jpg'
+
+    def test_serves_whole_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=600')
+
+        cached = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(suffix.streaming_content), b'789')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code,
+                         status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='Thu, 01 Jan 2015 00:00:00 GMT')
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+
+    def test_only_public_media_is_served(self):
+        self.assertEqual(self.client.get('/media/uploads/partial/x.part').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/media/properties/../uploads/partial/x.part').status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/media/properties/images/missing.jpg').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_files_follow_the_visibility_of_their_listings(self):
+        private = '/media/properties/images/ef/efg.jpg'
+        self.assertEqual(self.client.get('/media/properties/renditions/cd/cde.webp').status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(self.client.get(private).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get(private).status_code, status.HTTP_404_NOT_FOUND)
+
+        # The owner's API token opens their unpaid listing's image, kept out of shared caches.
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.owner)}')
+        response = self.client.get(private)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(self.client.get(self.url)['Cache-Control'], 'public, max-age=600')
+
+        # Soft-deleted listings serve nothing, not even to their owner.
+        self.unpaid.delete()
+        self.assertEqual(self.client.get(private).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.credentials()
+        Property.objects.filter(pk=self.listed.pk).update(is_listed=False)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_ACCEL='nginx', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_hands_off_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/properties/images/ab/abc.jpg')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_ACCEL='sendfile')
+    def test_hands_off_to_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, 'properties/images/ab/abc.jpg'))
+
+
+class PropertyImportCommandTests(APITestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.owner = User.objects.create_user(username="partner", password="password123", role="TENANT")
+        self.rows = [
+            {"title": f"Imported {n}", "description": "Lake view", "house_type": "House", "location": "Hawassa",
+             "price": "80.00", "bedrooms": "3", "bathrooms": "2", "max_guests": "6", "amenities": "Parking"}
+            for n in range(5)
+        ]
+        self.rows[2]["price"] = "0"
+
+    def write_csv(self, rows):
+        path = os.path.join(self.directory, 'listings.csv')
+        with open(path, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=[*self.rows[0], 'floor_number'])
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command('import_listings', path, owner='partner', batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_imports_csv_in_batches_and_writes_rejects(self):
+        path = self.write_csv(self.rows)
+        output = self.run_import(path)
+        self.assertIn("Imported 4 listings; 1 rows rejected", output)
+        self.assertIn("Row 5:", output)
+        imported = Property.objects.filter(owner=self.owner)
+        self.assertEqual(imported.count(), 4)
+        self.assertEqual(imported.first().amenity_tags, ['parking'])
+        self.assertIsNone(imported.first().floor_number)
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.role, 'OWNER')
+
+        with open(f'{path}.rejects') as rejects:
+            [reject] = [json.loads(line) for line in rejects]
+        self.assertEqual(reject['row'], 3)
+        self.assertIn('price', reject['errors'])
+        self.assertFalse(PropertyImport.objects.exists())
+
+    def test_resume_skips_committed_rows(self):
+        path = self.write_csv(self.rows)
+        # As if an earlier run had committed the first batch before it was interrupted.
+        PropertyImport.objects.create(path=os.path.abspath(path), owner=self.owner, rows=2)
+        self.run_import(path, resume=True)
+        self.assertEqual(
+            sorted(Property.objects.values_list('title', flat=True)), ["Imported 3", "Imported 4"],
+        )
+        self.assertFalse(PropertyImport.objects.exists())
+
+    def test_resume_after_a_crash_right_after_a_commit_inserts_nothing_twice(self):
+        path = self.write_csv(self.rows)
+
+        class CrashAfterFirstBatch(StringIO):
+            def write(self, text):
+                if text.startswith("Row 2:"):
+                    # The first batch has committed; the process dies before anything else.
+                    raise KeyboardInterrupt
+                return super().write(text)
+
+        with self.assertRaises(KeyboardInterrupt):
+            call_command('import_listings', path, owner='partner', batch_size=2, stdout=CrashAfterFirstBatch())
+        self.assertEqual(Property.objects.count(), 2)
+
+        self.assertIn("Imported 2 listings; 1 rows rejected", self.run_import(path, resume=True))
+        self.assertEqual(
+            sorted(Property.objects.values_list('title', flat=True)),
+            ["Imported 0", "Imported 1", "Imported 3", "Imported 4"],
+        )
+
+    def test_owner_is_promoted_with_the_first_committed_batch(self):
+        path = self.write_csv(self.rows)
+        original = Property.objects.bulk_create_listings
+        calls = []
+
+        def interrupt_second_batch(batch):
+            calls.append(batch)
+            if len(calls) > 1:
+                raise KeyboardInterrupt
+            return original(batch)
+
+        with mock.patch.object(Property.objects, 'bulk_create_listings', interrupt_second_batch):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_import(path)
+        self.assertEqual(Property.objects.filter(owner=self.owner).count(), 2)
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.role, 'OWNER')
+
+    def test_imports_ndjson(self):
+        path = os.path.join(self.directory, 'listings.ndjson')
+        with open(path, 'w') as handle:
+            for row in self.rows[:2]:
+                handle.write(json.dumps({**row, "bedrooms": 3, "is_available": False}) + '\n')
+            handle.write('{not json\n')
+        output = self.run_import(path)
+        self.assertIn("Imported 2 listings; 1 rows rejected", output)
+        self.assertFalse(Property.objects.filter(is_available=True).exists())
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=True, PROPERTY_EXPORT_CHUNK_SIZE=2)
+class PropertyExportTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="exportowner", password="password123", role="OWNER")
+        paid_until = timezone.now() + timedelta(days=10)
+        base = dict(owner=self.owner, description="D", house_type="Villa", location="Bole",
+                    bedrooms=2, bathrooms=1, max_guests=4, amenities="WiFi, Pool")
+        for n in range(5):
+            Property.objects.create(title=f"Listed {n}", price=100 + n, is_paid=True, paid_until=paid_until, **base)
+        Property.objects.create(title="Unpaid", price=50, **base)
+        self.url = '/api/properties/export/'
+
+    def lines(self, response):
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_ndjson_streams_every_visible_row(self):
+        response = self.client.get(self.url + '?max_price=103&ordering=-price')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.lines(response)]
+        self.assertEqual([row['title'] for row in rows], ["Listed 3", "Listed 2", "Listed 1", "Listed 0"])
+        self.assertEqual(rows[0]['amenity_tags'], ['wifi', 'pool'])
+        self.assertEqual(rows[0], self.client.get(f"/api/properties/{rows[0]['id']}/").data)
+
+    def test_owner_export_includes_unpaid_listings(self):
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(len(self.lines(self.client.get(self.url))), 6)
+
+    def test_csv_with_sparse_fields(self):
+        response = self.client.get(self.url + '?export_format=csv&fields=title,price,amenity_tags')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('properties.csv', response['Content-Disposition'])
+        rows = list(csv.reader(self.lines(response)))
+        self.assertEqual(rows[0], ['title', 'price', 'amenity_tags'])
+        self.assertEqual(rows[1], ['Listed 0', '100.00', 'wifi, pool'])
+        self.assertEqual(len(rows), 6)
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get(self.url + '?export_format=xml').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=True, PROPERTY_CHANGES_LAG=0, PROPERTY_CHANGES_PAGE_SIZE=2)
+class PropertyChangeFeedTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="feedowner", password="password123", role="OWNER")
+        self.url = '/api/properties/changes/'
+        self.props = [self.create(f"Flat {n}") for n in range(3)]
+
+    def create(self, title):
+        return Property.objects.create(
+            owner=self.owner, title=title, description="D", house_type="Condo", location="Bole", price=100,
+            bedrooms=1, bathrooms=1, max_guests=2, amenities="WiFi",
+            is_paid=True, paid_until=timezone.now() + timedelta(days=5),
+        )
+
+    def sync(self, token=None):
+        """Follow the feed to its end; returns (titles by id, removed ids, last token)."""
+        seen, removed = {}, []
+        while True:
+            data = self.client.get(self.url, {'since': token} if token else {}).data
+            seen.update({row['id']: row['title'] for row in data['results']})
+            removed += data['removed']
+            token = data['next']
+            if not data['has_more']:
+                return seen, removed, token
+
+    def test_feed_pages_through_everything_then_only_changes(self):
+        seen, removed, token = self.sync()
+        self.assertEqual(set(seen), {prop.pk for prop in self.props})
+        self.assertEqual(removed, [])
+
+        again = self.client.get(self.url, {'since': token}).data
+        self.assertEqual((again['results'], again['removed'], again['next']), ([], [], token))
+
+        self.props[0].title = "Renamed"
+        self.props[0].save()
+        self.props[1].delete()
+        Property.objects.filter(pk=self.props[2].pk).update(paid_until=timezone.now() - timedelta(minutes=1))
+        call_command('expire_listings', stdout=StringIO())
+        added = self.create("New flat")
+
+        seen, removed, _ = self.sync(token)
+        self.assertEqual(seen, {self.props[0].pk: "Renamed", added.pk: "New flat"})
+        self.assertEqual(sorted(removed), [self.props[1].pk, self.props[2].pk])
+
+    def test_owner_keeps_their_unlisted_rows(self):
+        Property.objects.filter(pk=self.props[2].pk).update(paid_until=timezone.now() - timedelta(minutes=1))
+        call_command('expire_listings', stdout=StringIO())
+        self.client.force_authenticate(user=self.owner)
+        seen, removed, _ = self.sync()
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(removed, [])
+
+    @override_settings(PROPERTY_CHANGES_LAG=60)
+    def test_recent_changes_wait_for_the_lag(self):
+        self.assertEqual(self.client.get(self.url).data['results'], [])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'garbage'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=True)
+class OwnerDashboardTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="dashowner", password="password123", role="OWNER")
+        self.tenant = User.objects.create_user(username="dashtenant", password="password123", role="TENANT")
+        base = dict(owner=self.owner, description="D", house_type="Condo", location="Bole",
+                    bedrooms=1, bathrooms=1, max_guests=2, amenities="WiFi")
+        self.paid = Property.objects.create(title="Paid", price=200, is_paid=True,
+                                            paid_until=timezone.now() + timedelta(days=10), **base)
+        self.unpaid = Property.objects.create(title="Unpaid", price=100, **base)
+        Property.objects.create(title="Deleted", price=300, **base).delete()
+        Property.objects.create(title="Someone else's", price=150,
+                                **{**base, 'owner': User.objects.create_user(username="dashother")})
+
+        Favorite.objects.create(user=self.tenant, property=self.paid)
+        Favorite.objects.create(user=User.objects.create_user(username="fan"), property=self.paid)
+        conversation = Conversation.objects.create(property=self.paid)
+        conversation.participants.add(self.owner, self.tenant)
+        Message.objects.create(conversation=conversation, sender=self.tenant, content="Is it free?")
+        Message.objects.create(conversation=conversation, sender=self.tenant, content="Seen", is_read=True)
+        Message.objects.create(conversation=conversation, sender=self.owner, content="Yes")
+        PaymentLog.objects.create(property=self.paid, owner=self.owner, amount_paid="10.00", status="FAILED")
+        self.latest = PaymentLog.objects.create(property=self.paid, owner=self.owner, amount_paid="15.00")
+        self.url = '/api/properties/dashboard/'
+
+    def test_dashboard_annotates_owned_properties_in_one_query(self):
+        self.client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url + '?ordering=-price')
+        rows = {row['title']: row for row in response.data['results']}
+        self.assertEqual(list(rows), ["Paid", "Unpaid"])
+
+        paid = rows["Paid"]
+        self.assertEqual((paid['favorites_count'], paid['conversations_count'], paid['unread_messages']), (2, 1, 1))
+        self.assertEqual(paid['latest_payment']['id'], self.latest.pk)
+        self.assertEqual(paid['latest_payment']['amount_paid'], '15.00')
+        self.assertTrue(paid['latest_payment']['payment_date'].endswith('Z'))
+        self.assertEqual(paid['days_until_expiry'], 10)
+
+        unpaid = rows["Unpaid"]
+        self.assertEqual((unpaid['favorites_count'], unpaid['conversations_count']), (0, 0))
+        self.assertIsNone(unpaid['latest_payment'])
+        self.assertIsNone(unpaid['days_until_expiry'])
+
+    @mock.patch.object(PropertyCursorPagination, 'page_size', 1)
+    def test_dashboard_pages_with_cursors(self):
+        self.client.force_authenticate(user=self.owner)
+        first = self.client.get(self.url + '?ordering=price').data
+        self.assertEqual([row['title'] for row in first['results']], ["Unpaid"])
+        second = self.client.get(first['next']).data
+        self.assertEqual([row['title'] for row in second['results']], ["Paid"])
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=False, PROPERTY_CACHE_TTL=60)
+class PropertyPopularityTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="popowner", password="password123", role="OWNER")
+        self.tenant = User.objects.create_user(username="poptenant", password="password123", role="TENANT")
+        base = dict(owner=self.owner, description="D", house_type="Condo", location="Bole",
+                    bedrooms=1, bathrooms=1, max_guests=2, amenities="WiFi", price=100)
+        self.quiet = Property.objects.create(title="Quiet", **base)
+        self.popular = Property.objects.create(title="Popular", **base)
+        self.url = '/api/properties/'
+
+    def favorite(self, user, prop):
+        self.client.force_authenticate(user=user)
+        response = self.client.post('/api/interactions/favorites/', {"property": prop.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def counts(self, prop):
+        prop.refresh_from_db()
+        return prop.favorite_count, prop.inquiry_count
+
+    def test_favorites_and_conversations_maintain_the_counters(self):
+        favorite_id = self.favorite(self.tenant, self.popular)
+        self.favorite(User.objects.create_user(username="popfan"), self.popular)
+        self.assertEqual(self.counts(self.popular), (2, 0))
+
+        self.client.force_authenticate(user=self.tenant)
+        self.client.delete(f'/api/interactions/favorites/{favorite_id}/')
+        response = self.client.post('/api/messaging/conversations/start/', {
+            "recipient_id": self.owner.id, "property_id": self.popular.id, "initial_message": "Free?",
+        })
+        self.assertEqual(self.counts(self.popular), (1, 1))
+
+        self.client.delete(f"/api/messaging/conversations/{response.data['id']}/")
+        self.assertEqual(self.counts(self.popular), (1, 0))
+        self.assertEqual(self.counts(self.quiet), (0, 0))
+
+    def test_counters_are_not_writable_or_serialized(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.patch(f"{self.url}{self.quiet.id}/", {"favorite_count": 50}, format='json')
+        self.assertNotIn('favorite_count', response.data)
+        self.assertEqual(self.counts(self.quiet), (0, 0))
+
+    def test_ordering_by_popularity(self):
+        self.favorite(self.tenant, self.popular)
+        titles = [row['title'] for row in self.client.get(self.url + '?ordering=-popularity').data['results']]
+        self.assertEqual(titles, ["Popular", "Quiet"])
+        titles = [row['title'] for row in self.client.get(self.url + '?ordering=popularity').data['results']]
+        self.assertEqual(titles, ["Quiet", "Popular"])
+
+    @mock.patch.object(PropertyCursorPagination, 'page_size', 1)
+    def test_list_cursor_pages_by_popularity(self):
+        self.favorite(self.tenant, self.popular)
+        self.client.force_authenticate(user=None)
+        first = self.client.get(self.url + '?pagination=cursor&ordering=-popularity')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['title'] for row in first.data['results']], ["Popular"])
+        second = self.client.get(first.data['next']).data
+        self.assertEqual([row['title'] for row in second['results']], ["Quiet"])
+        back = self.client.get(second['previous']).data
+        self.assertEqual([row['title'] for row in back['results']], ["Popular"])
+
+    @mock.patch.object(PropertyCursorPagination, 'page_size', 1)
+    def test_dashboard_pages_by_popularity(self):
+        self.favorite(self.tenant, self.quiet)
+        self.client.force_authenticate(user=self.owner)
+        first = self.client.get('/api/properties/dashboard/?ordering=-popularity').data
+        self.assertEqual([row['title'] for row in first['results']], ["Quiet"])
+        second = self.client.get(first['next']).data
+        self.assertEqual([row['title'] for row in second['results']], ["Popular"])
+
+    def test_favorite_invalidates_popularity_ordered_lists_only(self):
+        by_popularity = self.client.get(self.url + '?ordering=-popularity')
+        by_price = self.client.get(self.url + '?ordering=price')
+        self.favorite(self.tenant, self.quiet)
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(self.url + '?ordering=-popularity', HTTP_IF_NONE_MATCH=by_popularity['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['title'], "Quiet")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url + '?ordering=price', HTTP_IF_NONE_MATCH=by_price['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_reconcile_command_fixes_drifted_counters(self):
+        Favorite.objects.create(user=self.tenant, property=self.popular)
+        Conversation.objects.create(property=self.popular)
+        Property.objects.filter(pk=self.quiet.pk).update(favorite_count=7)
+
+        out = StringIO()
+        call_command('reconcile_property_counters', dry_run=True, stdout=out)
+        self.assertIn("2 properties would be fixed", out.getvalue())
+        self.assertEqual(self.counts(self.popular), (0, 0))
+
+        call_command('reconcile_property_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.counts(self.popular), (1, 1))
+        self.assertEqual(self.counts(self.quiet), (0, 0))
+
+
+@override_settings(REQUIRE_LISTING_PAYMENT=True)
+class LocationAutocompleteTests(APITestCase):
+
+    def setUp(self):
+        reset_location_index()
+        self.addCleanup(reset_location_index)
+        self.owner = User.objects.create_user(username="acowner", password="password123", role="OWNER")
+        self.base = dict(owner=self.owner, description="D", house_type="Condo", price=100,
+                         bedrooms=1, bathrooms=1, max_guests=2, amenities="WiFi")
+        for location in ("Bole", "Bole", "Bole Atlas", "Kazanchis, Addis Ababa"):
+            self.listing(location)
+        Property.objects.create(title="Unpaid", location="Bolo", **self.base)
+        self.url = '/api/properties/locations/autocomplete/'
+
+    def listing(self, location):
+        return Property.objects.create(title=location, location=location, is_paid=True,
+                                       paid_until=timezone.now() + timedelta(days=5), **self.base)
+
+    def suggest(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row['location'], row['listings']) for row in response.data['suggestions']]
+
+    def test_prefix_matches_weighted_by_visible_listings_without_queries(self):
+        self.suggest("b")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest("BO"), [("Bole", 2), ("Bole Atlas", 1)])
+            self.assertEqual(self.suggest("addis  ab"), [("Kazanchis, Addis Ababa", 1)])
+            self.assertEqual(self.suggest("bo", limit=1), [("Bole", 2)])
+            self.assertEqual(self.suggest("atl"), [("Bole Atlas", 1)])
+            self.assertEqual(self.suggest("x"), [])
+            self.assertEqual(self.suggest(""), [])
+
+    def test_ignores_credentials(self):
+        self.suggest("b")
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest("kaz"), [("Kazanchis, Addis Ababa", 1)])
+
+    def test_writes_update_the_index_after_commit(self):
+        self.suggest("b")
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = self.listing("Gerji")
+        self.assertEqual(self.suggest("ger"), [("Gerji", 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.location = "Bole"
+            moved.save()
+        self.assertEqual(self.suggest("ger"), [])
+        self.assertEqual(self.suggest("bole"), [("Bole", 3), ("Bole Atlas", 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Property.objects.get(location="Bole Atlas").delete()
+        self.assertEqual(self.suggest("bole"), [("Bole", 3)])
+
+    def test_rebuild_picks_up_writes_that_send_no_signals(self):
+        self.suggest("b")
+        Property.objects.filter(location="Bolo").update(is_listed=True)
+        self.assertEqual(self.suggest("bolo"), [])
+        rebuild_location_index()
+        self.assertEqual(self.suggest("bolo"), [("Bolo", 1)])
+
+    def test_index_updates_are_copies(self):
+        index = LocationIndex({"Bole": 2, "Gerji": 1})
+        updated = index.updated({"Gerji": 0, "Summit": 4})
+        self.assertEqual(updated.lookup("", 5), [])
+        self.assertEqual(updated.lookup("s", 5), [("Summit", 4)])
+        self.assertEqual(updated.lookup("g", 5), [])
+        self.assertEqual(index.lookup("g", 5), [("Gerji", 1)])
@@ -0,0 +1,147 @@
+"""
+Size- and dimension-capped image uploads.
+
+PropertyImageUploadHandler sits in front of Django's TemporaryFileUploadHandler
+for property requests: it counts bytes as they stream in and reads the image
+header from the first chunks, so an oversized file or a non-image is rejected
+before the rest of the body is read, and accepted files go to a temporary file
+on disk rather than into memory.
+
+Large images can instead be sent in pieces through PropertyImageUpload
+(see PropertyImageUploadViewSet), which appends each chunk to a partial file
+under MEDIA_ROOT and checks the same header once the first bytes are in.
+"""
+import struct
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+
+# Enough for the JPEG start-of-frame to follow a large EXIF block.
+HEADER_LIMIT = 256 * 1024
+# Room for the non-file form fields sent along with the image.
+FORM_OVERHEAD = 1024 * 1024
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class ImageUploadRejected(MultiPartParserError):
+    """Raised while an upload is still streaming in; DRF answers it with 400."""
+
+
+def _jpeg_size(data):
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            raise ValueError("Corrupt JPEG header.")
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None
+
+
+def _webp_size(data):
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L':
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    raise ValueError("Unsupported WebP encoding.")
+
+
+def read_image_size(data):
+    """
+    (format, width, height) from the first bytes of a JPEG, PNG, GIF or WebP file,
+    None if more bytes are needed; ValueError if it is not one of those formats.
+    """
+    if len(data) < 12:
+        return None
+    if data.startswith(b'\xff\xd8'):
+        size = _jpeg_size(data)
+        image_format = 'JPEG'
+    elif data.startswith(b'\x89PNG\r\n\x1a\n'):
+        size = struct.unpack('>II', data[16:24]) if len(data) >= 24 else None
+        image_format = 'PNG'
+    elif data[:6] in (b'GIF87a', b'GIF89a'):
+        size = struct.unpack('<HH', data[6:10])
+        image_format = 'GIF'
+    elif data.startswith(b'RIFF') and data[8:12] == b'WEBP':
+        size = _webp_size(data)
+        image_format = 'WEBP'
+    else:
+        raise ValueError("Unsupported image type; use JPEG, PNG, GIF or WebP.")
+    return (image_format, *size) if size else None
+
+
+def check_image_header(data, complete=False):
+    """
+    Validate an image's leading bytes against PROPERTY_IMAGE_MAX_DIMENSION.
+    Returns True once decided, False if more data is needed (and may come);
+    raises ValueError with a client-facing message if the image is refused.
+    """
+    info = read_image_size(data)
+    if info is None:
+        if complete or len(data) >= HEADER_LIMIT:
+            raise ValueError("Could not read the image dimensions.")
+        return False
+    _, width, height = info
+    limit = settings.PROPERTY_IMAGE_MAX_DIMENSION
+    if width > limit or height > limit:
+        raise ValueError(f"Image is {width}x{height}; the maximum is {limit}x{limit} pixels.")
+    return True
+
+
+def size_error(limit):
+    return f"Image exceeds the {limit // (1024 * 1024)} MB upload limit."
+
+
+class PropertyImageUploadHandler(FileUploadHandler):
+    """Rejects oversized or non-image files as soon as the streamed bytes show it."""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        limit = settings.PROPERTY_IMAGE_MAX_UPLOAD_SIZE
+        if content_length and content_length > limit + FORM_OVERHEAD:
+            raise ImageUploadRejected(size_error(limit))
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.header_checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        limit = settings.PROPERTY_IMAGE_MAX_UPLOAD_SIZE
+        if self.received > limit:
+            raise ImageUploadRejected(size_error(limit))
+        if not self.header_checked:
+            self.header += raw_data[:HEADER_LIMIT - len(self.header)]
+            self.check_header(complete=False)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not self.header_checked:
+            self.check_header(complete=True)
+        return None
+
+    def check_header(self, complete):
+        try:
+            self.header_checked = check_image_header(self.header, complete=complete)
+        except ValueError as error:
+            raise ImageUploadRejected(f"{self.file_name}: {error}")
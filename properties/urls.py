@@ -1,8 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PropertyViewSet
+from .views import PropertyImageUploadViewSet, PropertyViewSet
 
 router = DefaultRouter()
+# Before the catch-all property routes, which would read 'uploads' as a pk.
+router.register(r'uploads', PropertyImageUploadViewSet, basename='property-image-upload')
 router.register(r'', PropertyViewSet, basename='property')
 
 urlpatterns = [
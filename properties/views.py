@@ -1,13 +1,51 @@
-from rest_framework import viewsets, permissions, filters, status
+import csv
+import os
+from collections import Counter
+
+from rest_framework import mixins, viewsets, permissions, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from django_filters.rest_framework import DjangoFilterBackend
 from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Upper
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 import django_filters
 
-from .models import Property
-from .serializers import PropertySerializer
+from .autocomplete import MAX_SUGGESTIONS, get_location_index
+from .cache import (
+    listing_generation, make_key, ordering_generation, property_version, query_signature, visibility_class,
+)
+from .changes import InvalidToken, changed_since, decode_token, encode_token
+from .clusters import MAX_TILES, MAX_ZOOM, cluster_tiles, tiles_for_viewport
+from .conditional import detail_validators, list_validators, not_modified, set_validators
+from .dashboard import owner_dashboard_queryset
+from .facets import facet_counts
+from .fast_serializers import ValuesSerializer
+from .geo import bounding_box, distance_expression
+from .models import Property, PropertyImageUpload, parse_amenities
+from .serializers import (
+    OwnerDashboardSerializer, PropertyImageUploadSerializer, PropertyListSerializer, PropertySerializer,
+)
+from .pagination import PropertyCursorPagination, PropertyPageNumberPagination
 from .permissions import IsOwnerOrReadOnly
+from .search import PropertySearchFilter
+from .uploads import HEADER_LIMIT, PropertyImageUploadHandler, check_image_header
+
+
+class AmenityListFilter(django_filters.BaseCSVFilter, django_filters.CharFilter):
+    """Comma-separated amenity names, e.g. ?amenities_all=wifi,parking."""
+
+
+class NumberListFilter(django_filters.BaseCSVFilter, django_filters.NumberFilter):
+    """Comma-separated numbers, e.g. ?near=9.01,38.76."""
 
 
 class PropertyFilter(django_filters.FilterSet):
@@ -26,22 +64,176 @@ class PropertyFilter(django_filters.FilterSet):
     max_guests__gte = django_filters.NumberFilter(field_name="max_guests", lookup_expr='gte')
     max_guests__lte = django_filters.NumberFilter(field_name="max_guests", lookup_expr='lte')
 
-    location = django_filters.CharFilter(field_name="location", lookup_expr='icontains')
+    # ?location_match=fuzzy switches ?location= from substring to trigram matching,
+    # so "Boley" still finds "Bole". Both modes use property_location_trgm_idx.
+    location = django_filters.CharFilter(method='filter_location')
+    location_match = django_filters.ChoiceFilter(
+        choices=[('contains', 'contains'), ('fuzzy', 'fuzzy')], method='filter_noop'
+    )
     amenities = django_filters.CharFilter(field_name="amenities", lookup_expr='icontains')
+    # Index-backed containment on Property.amenity_tags: all-of (@>) and any-of (&&).
+    amenities_all = AmenityListFilter(method='filter_amenity_tags')
+    amenities_any = AmenityListFilter(method='filter_amenity_tags')
+
+    # ?near=lat,lng annotates `distance` (km) and sorts by it; add ?radius_km= to restrict.
+    # ?bbox=min_lng,min_lat,max_lng,max_lat restricts to a map viewport.
+    near = NumberListFilter(method='filter_near')
+    radius_km = django_filters.NumberFilter(method='filter_noop')
+    bbox = NumberListFilter(method='filter_bbox')
 
     class Meta:
         model = Property
         fields = ['house_type', 'is_available']
 
+    def filter_location(self, queryset, name, value):
+        if self.form.cleaned_data.get('location_match') != 'fuzzy':
+            return queryset.filter(location__icontains=value)
+        # word_similarity(value, UPPER(location)) > pg_trgm.word_similarity_threshold, best match first.
+        return queryset.alias(location_upper=Upper('location')).filter(
+            location_upper__trigram_word_similar=value
+        ).annotate(
+            location_similarity=TrigramWordSimilarity(value, Upper('location'))
+        ).order_by('-location_similarity', '-id')
+
+    def filter_amenity_tags(self, queryset, name, value):
+        tags = parse_amenities(','.join(value))
+        if not tags:
+            return queryset
+        lookup = 'amenity_tags__contains' if name == 'amenities_all' else 'amenity_tags__overlap'
+        return queryset.filter(**{lookup: tags})
+
+    def filter_near(self, queryset, name, value):
+        if len(value) != 2:
+            raise ValidationError({'near': 'Expected "lat,lng".'})
+        lat, lng = (float(v) for v in value)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValidationError({'near': 'Latitude must be within [-90, 90] and longitude within [-180, 180].'})
+
+        radius = self.form.cleaned_data.get('radius_km')
+        if radius is not None:
+            if radius <= 0:
+                raise ValidationError({'radius_km': 'Must be greater than zero.'})
+            min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, float(radius))
+            # Cheap indexed prefilter first; the exact great-circle test then only sees the box.
+            queryset = queryset.filter(
+                latitude__gte=min_lat, latitude__lte=max_lat,
+                longitude__gte=min_lng, longitude__lte=max_lng,
+            )
+        else:
+            queryset = queryset.filter(latitude__isnull=False, longitude__isnull=False)
+
+        queryset = queryset.annotate(distance=distance_expression(lat, lng))
+        if radius is not None:
+            queryset = queryset.filter(distance__lte=float(radius))
+        return queryset.order_by('distance', 'id')
+
+    def filter_bbox(self, queryset, name, value):
+        if len(value) != 4:
+            raise ValidationError({'bbox': 'Expected "min_lng,min_lat,max_lng,max_lat".'})
+        min_lng, min_lat, max_lng, max_lat = value
+        if min_lat > max_lat or min_lng > max_lng:
+            raise ValidationError({'bbox': 'Minimum values must not exceed maximum values.'})
+        return queryset.filter(
+            latitude__gte=min_lat, latitude__lte=max_lat,
+            longitude__gte=min_lng, longitude__lte=max_lng,
+        )
+
+    def filter_noop(self, queryset, name, value):
+        """For parameters that only modify how another filter behaves."""
+        return queryset
+
+
+class Echo:
+    """File-like object whose write() hands the value back, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        values = (row[name] for name in header)
+        yield writer.writerow([', '.join(value) if isinstance(value, list) else value for value in values])
+
+
+def chunked(lines, size):
+    """Join `size` lines per piece, so a streamed export isn't sent one tiny write per row."""
+    piece = []
+    for line in lines:
+        piece.append(line)
+        if len(piece) == size:
+            yield ''.join(piece)
+            piece = []
+    if piece:
+        yield ''.join(piece)
+
+
+class PropertyOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that also accepts sort keys backed by annotations, such as
+    `distance` from ?near=. Such a key is ignored when the annotation is absent.
+
+    Public sort keys that name a model field differently are translated through
+    `field_aliases`. `popularity` ties are common (most listings have no
+    favorites yet), so it is followed by `id`, matching property_*_popular_idx.
+    """
+    annotation_fields = ('distance',)
+    field_aliases = {'popularity': ('favorite_count', 'id')}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering:
+            ordering = [
+                term for term in ordering
+                if term.lstrip('-') not in self.annotation_fields
+                or term.lstrip('-') in queryset.query.annotations
+            ]
+            ordering = [
+                prefix + field
+                for term in ordering
+                for prefix in ['-' if term.startswith('-') else '']
+                for field in self.field_aliases.get(term.lstrip('-'), (term.lstrip('-'),))
+            ]
+        return ordering or None
+
 
 class PropertyViewSet(viewsets.ModelViewSet):
     serializer_class = PropertySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    pagination_class = PropertyPageNumberPagination
     
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PropertySearchFilter, PropertyOrderingFilter]
     filterset_class = PropertyFilter
-    search_fields = ['title', 'description', 'location']
-    ordering_fields = ['price', 'created_at']
+    # Searched through Property.search_vector (title A, location B, description C).
+    search_fields = ['title', 'location', 'description']
+    ordering_fields = ['price', 'created_at', 'distance', 'popularity']
+    always_loaded_columns = ('id', 'price', 'created_at', 'favorite_count', 'updated_at', 'is_paid', 'paid_until', 'is_listed')
+    # Read by the change feed to tell updates from tombstones and to build the next token.
+    change_columns = ('id', 'updated_at', 'is_deleted', 'is_listed', 'owner_id')
+    # Files can't travel in a JSON list; bulk writes leave them to per-property requests.
+    bulk_omitted_fields = ('image', 'image_upload')
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Multipart images are size/header-checked while they stream in and
+        # spooled to a temporary file, never held in memory whole.
+        request.upload_handlers = [PropertyImageUploadHandler(request), TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    @property
+    def paginator(self):
+        """
+        Page numbers by default; keyset pagination when the client opts in with
+        ?pagination=cursor (or follows a link that carries a ?cursor=).
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request is not None else {}
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = PropertyCursorPagination()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
 
     def get_queryset(self):
         """
@@ -51,43 +243,496 @@ class PropertyViewSet(viewsets.ModelViewSet):
         Owners can always see their own soft-deleted or unpaid properties (though we strip soft-deleted even for owners to keep list logic clean, they can't access them anymore).
         Actually, let's keep it simple: No one sees soft deleted properties via list/retrieve API.
         """
-        user = self.request.user
-        queryset = Property.objects.active() # active() filters out is_deleted=True
-        
-        # If listing payment is required, we must filter out unpaid or expired listings
-        # UNLESS the user requesting them is the owner of the listing.
-        if settings.REQUIRE_LISTING_PAYMENT:
-            now = timezone.now()
-            # A property is valid if it's paid AND its paid_until is in the future.
-            # However, for an owner, they should see their OWN properties regardless of payment status.
-            if user.is_authenticated:
-                # User sees: (paid AND not expired) OR (owner == user)
-                import operator
-                from django.db.models import Q
-                
-                # Payment condition
-                payment_condition = Q(is_paid=True, paid_until__gt=now)
-                # Ownership condition
-                owner_condition = Q(owner=user)
-                
-                queryset = queryset.filter(payment_condition | owner_condition)
-            else:
-                # Anonymous users only see paid & valid properties
-                queryset = queryset.filter(is_paid=True, paid_until__gt=now)
-                
+        # visible_to() applies both rules using the predicates the partial
+        # indexes in Property.Meta are built for.
+        queryset = Property.objects.visible_to(self.request.user)
+        if self.action in ('list', 'retrieve'):
+            # Read only the columns the response shows, plus those the view itself
+            # needs: cursor keys for pagination (favorite_count for popularity) and
+            # the detail ETag/cache inputs.
+            queryset = queryset.only(*self.get_serializer().model_columns(), *self.always_loaded_columns)
         return queryset
 
+    def get_serializer_class(self):
+        # ?fields= picks from the full representation, so it bypasses the compact one.
+        if self.action == 'list' and 'fields' not in self.request.query_params:
+            return PropertyListSerializer
+        return PropertySerializer
+
+    def get_serializer(self, *args, **kwargs):
+        """
+        Sparse fieldsets for reads: ?fields=id,title,price keeps only those keys,
+        ?omit=description drops keys.
+        """
+        if self.action in ('list', 'retrieve', 'export', 'changes'):
+            for param in ('fields', 'omit'):
+                value = self.request.query_params.get(param)
+                if value is not None:
+                    kwargs.setdefault(param, [name.strip() for name in value.split(',') if name.strip()])
+        return super().get_serializer(*args, **kwargs)
+
+    def response_cache_key(self, *parts):
+        """
+        Cache key for a read response. Responses embed absolute URLs (page links,
+        images), so the origin is part of the key along with the query string.
+        """
+        request = self.request
+        return make_key(
+            *parts, visibility_class(request), request.scheme, request.get_host(),
+            query_signature(request),
+        )
+
+    def list(self, request, *args, **kwargs):
+        use_cache = settings.PROPERTY_CACHE_TTL > 0
+        key = self.response_cache_key('list', listing_generation(), ordering_generation(request)) if use_cache else None
+        entry = cache.get(key) if use_cache else None
+        if entry is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            page, render = self.list_page(queryset)
+            validators = list_validators(request, page, self.paginator)
+            response = not_modified(request, *validators)
+            if response is not None:
+                return response
+            data = render()
+            if use_cache:
+                cache.set(key, (validators, data), settings.PROPERTY_CACHE_TTL)
+        else:
+            validators, data = entry
+            response = not_modified(request, *validators)
+            if response is not None:
+                return response
+        return set_validators(Response(data), *validators)
+
+    def list_page(self, queryset):
+        """
+        (rows, render) for a list request: the rows of the requested page and a
+        callable producing the (paginated) payload from them, so validators can be
+        checked between reading and serializing. Rows are read with .values() and
+        rendered by ValuesSerializer, which produces the serializer's exact output
+        without building model instances or running per-field to_representation().
+        """
+        rows = ValuesSerializer(self.get_serializer())
+        if rows.supported:
+            queryset = queryset.values(*dict.fromkeys(rows.columns + self.always_loaded_columns))
+            serialize = rows.serialize
+        else:
+            def serialize(page):
+                return self.get_serializer(page, many=True).data
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            page = list(queryset)
+            return page, lambda: serialize(page)
+        return page, lambda: self.get_paginated_response(serialize(page)).data
+
+    def retrieve(self, request, *args, **kwargs):
+        # Keyed by the numeric pk, the one writes bump: "/01/" must not get a version of its own.
+        # Anything else isn't a pk and 404s in get_object().
+        use_cache = settings.PROPERTY_CACHE_TTL > 0 and kwargs[self.lookup_field].isdigit()
+        if use_cache:
+            pk = int(kwargs[self.lookup_field])
+            key = self.response_cache_key('detail', pk, property_version(pk))
+        entry = cache.get(key) if use_cache else None
+        if entry is None:
+            instance = self.get_object()
+            validators = detail_validators(instance)
+            response = not_modified(request, *validators)
+            if response is not None:
+                return response
+            data = self.get_serializer(instance).data
+            if use_cache:
+                cache.set(key, (validators, data), settings.PROPERTY_CACHE_TTL)
+        else:
+            validators, data = entry
+            response = not_modified(request, *validators)
+            if response is not None:
+                return response
+        return set_validators(Response(data), *validators)
+
+    @action(detail=False, methods=['get'], url_path='locations/suggest')
+    def suggest_locations(self, request):
+        """
+        "Did you mean" suggestions: the distinct locations closest to ?q=.
+
+        GET /api/properties/locations/suggest/?q=Boley&limit=5
+        Served by the trigram index, so it stays fast on a large catalogue.
+        """
+        term = request.query_params.get('q', '').strip()
+        if len(term) < 2:
+            return Response({"query": term, "suggestions": []})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), 20)
+        except ValueError:
+            limit = 5
+
+        rows = (
+            self.get_queryset()
+            .alias(location_upper=Upper('location'))
+            .filter(location_upper__trigram_word_similar=term)
+            .values('location')
+            .annotate(
+                similarity=TrigramWordSimilarity(term, Upper('location')),
+                listings=Count('id'),
+            )
+            .order_by('-similarity', '-listings', 'location')[:limit]
+        )
+        return Response({
+            "query": term,
+            "suggestions": [
+                {"location": row['location'], "listings": row['listings'], "similarity": round(row['similarity'], 3)}
+                for row in rows
+            ],
+        })
+
+    @action(
+        detail=False, methods=['get'], url_path='locations/autocomplete',
+        authentication_classes=[], permission_classes=[permissions.AllowAny],
+    )
+    def autocomplete_locations(self, request):
+        """
+        Typeahead for the search box: public locations starting with ?q= (at any
+        word), most visible listings first.
+
+        GET /api/properties/locations/autocomplete/?q=bo&limit=5
+        Answered from the per-process prefix index in autocomplete.py, without a
+        database query; the request is not authenticated, so tokens cost nothing either.
+        """
+        term = request.query_params.get('q', '').strip()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), MAX_SUGGESTIONS)
+        except ValueError:
+            limit = 5
+        return Response({
+            "query": term,
+            "suggestions": [
+                {"location": location, "listings": listings}
+                for location, listings in get_location_index().lookup(term, limit)
+            ],
+        })
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facets(self, request):
+        """
+        Counts per house type, bedroom bucket, price band and availability for the
+        current filters and search, all from one aggregate query.
+
+        GET /api/properties/facets/?search=garden&max_price=5000
+        Cached per filter signature until the next listing write.
+        """
+        key = make_key(
+            'facets', listing_generation(), visibility_class(request),
+            query_signature(request, ignore=PropertyPageNumberPagination.count_ignored_params),
+        )
+        data = cache.get(key) if settings.PROPERTY_CACHE_TTL > 0 else None
+        if data is None:
+            data = facet_counts(self.filter_queryset(self.get_queryset()))
+            if settings.PROPERTY_CACHE_TTL > 0:
+                cache.set(key, data, settings.PROPERTY_CACHE_TTL)
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path='clusters')
+    def clusters(self, request):
+        """
+        Map clusters for a viewport: listing count, centroid and price range per grid cell.
+
+        GET /api/properties/clusters/?zoom=12&bbox=38.70,8.95,38.85,9.05
+        Accepts the same filters as the list. Results are computed and cached per
+        grid tile, so panning only aggregates the tiles that were not seen yet.
+        """
+        params = request.query_params.copy()
+        try:
+            zoom = int(params.pop('zoom', [''])[0])
+        except ValueError:
+            raise ValidationError({'zoom': 'A whole number is required.'})
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValidationError({'zoom': f'Must be between 0 and {MAX_ZOOM}.'})
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(v) for v in params.pop('bbox', [''])[0].split(','))
+        except ValueError:
+            raise ValidationError({'bbox': 'Expected "min_lng,min_lat,max_lng,max_lat".'})
+        if min_lat > max_lat or min_lng > max_lng:
+            raise ValidationError({'bbox': 'Minimum values must not exceed maximum values.'})
+
+        tiles = tiles_for_viewport(zoom, min_lng, min_lat, max_lng, max_lat)
+        if len(tiles) > MAX_TILES:
+            raise ValidationError({'bbox': 'Viewport too large for this zoom level.'})
+
+        # The viewport only selects tiles; every other parameter narrows the
+        # listings being clustered and is part of each tile's cache key.
+        prefix = make_key(
+            'clusters', listing_generation(), visibility_class(request),
+            query_signature(request, ignore=('zoom', 'bbox')), zoom,
+        )
+        keys = {tile: make_key(prefix, *tile) for tile in tiles}
+        cached = cache.get_many(keys.values()) if settings.PROPERTY_CLUSTER_CACHE_TTL > 0 else {}
+        missing = [tile for tile in tiles if keys[tile] not in cached]
+
+        if missing:
+            filterset = PropertyFilter(params, queryset=self.get_queryset(), request=request)
+            if not filterset.is_valid():
+                raise ValidationError(filterset.errors)
+            queryset = PropertySearchFilter().filter_queryset(request, filterset.qs, self)
+            computed = cluster_tiles(queryset, zoom, missing)
+            if settings.PROPERTY_CLUSTER_CACHE_TTL > 0:
+                cache.set_many(
+                    {keys[tile]: clusters for tile, clusters in computed.items()},
+                    settings.PROPERTY_CLUSTER_CACHE_TTL,
+                )
+            cached.update({keys[tile]: clusters for tile, clusters in computed.items()})
+
+        return Response({
+            "zoom": zoom,
+            "clusters": [cluster for tile in tiles for cluster in cached[keys[tile]]],
+        })
+
+    @action(detail=False, methods=['get'], url_path='dashboard', permission_classes=[permissions.IsAuthenticated])
+    def dashboard(self, request):
+        """
+        The caller's own properties, unpaid and expired ones included, each with
+        its favorites, conversations, unread messages, latest payment and days
+        until paid_until -- one query per page, paged with keyset cursors
+        (?ordering=price|created_at|popularity, default -created_at).
+        """
+        paginator = PropertyCursorPagination()
+        page = paginator.paginate_queryset(owner_dashboard_queryset(request.user), request, view=self)
+        serializer = OwnerDashboardSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        The whole filtered result (same filters, search, ordering and visibility as
+        the list) streamed as NDJSON or, with ?export_format=csv, CSV; ?fields= and
+        ?omit= pick the columns. Rows come off a server-side cursor in chunks of
+        PROPERTY_EXPORT_CHUNK_SIZE, so memory stays bounded however large the catalogue.
+        """
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            raise ValidationError({'export_format': 'Expected "ndjson" or "csv".'})
+        queryset = self.filter_queryset(self.get_queryset())
+        if not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        serializer = self.get_serializer()
+        rows = self.export_rows(queryset, serializer, settings.PROPERTY_EXPORT_CHUNK_SIZE)
+        if export_format == 'csv':
+            header = [name for name, field in serializer.fields.items() if not field.write_only]
+            content, content_type = csv_lines(header, rows), 'text/csv; charset=utf-8'
+        else:
+            encoder = JSONEncoder()
+            content, content_type = (encoder.encode(row) + '\n' for row in rows), 'application/x-ndjson'
+        response = StreamingHttpResponse(
+            chunked(content, settings.PROPERTY_EXPORT_CHUNK_SIZE), content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="properties.{export_format}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        Properties changed since ?since=<token> (everything without one), oldest
+        change first: `results` holds the current representation of rows the
+        caller can see, `removed` the ids of changed rows they can no longer see
+        (soft-deleted or unlisted). Store `next` and pass it as ?since= on the
+        following sync; keep going while `has_more` is true.
+        """
+        token = request.query_params.get('since')
+        try:
+            position = decode_token(token) if token else None
+        except InvalidToken:
+            raise ValidationError({'since': 'Invalid token.'})
+
+        serializer = self.get_serializer()
+        rows = ValuesSerializer(serializer)
+        # Every row, deleted and unlisted included: those become tombstones.
+        queryset = Property.objects.all()
+        if rows.supported:
+            queryset = queryset.values(*dict.fromkeys(rows.columns + self.change_columns))
+            column = dict.__getitem__
+        else:
+            column = getattr
+        page, has_more = changed_since(queryset, position, settings.PROPERTY_CHANGES_PAGE_SIZE)
+
+        user = request.user
+        visible, removed = [], []
+        for row in page:
+            # Same rule as PropertyQuerySet.visible_to().
+            shown = not column(row, 'is_deleted') and (
+                not settings.REQUIRE_LISTING_PAYMENT or column(row, 'is_listed')
+                or (user.is_authenticated and column(row, 'owner_id') == user.pk)
+            )
+            if shown:
+                visible.append(row)
+            else:
+                removed.append(column(row, 'id'))
+        if page:
+            token = encode_token(column(page[-1], 'updated_at'), column(page[-1], 'id'))
+        return Response({
+            'next': token,
+            'has_more': has_more,
+            'results': rows.serialize(visible) if rows.supported else [
+                serializer.to_representation(instance) for instance in visible
+            ],
+            'removed': removed,
+        })
+
+    @staticmethod
+    def export_rows(queryset, serializer, chunk_size):
+        rows = ValuesSerializer(serializer)
+        if not rows.supported:
+            for instance in queryset.iterator(chunk_size=chunk_size):
+                yield serializer.to_representation(instance)
+            return
+        batch = []
+        for row in queryset.values(*rows.columns).iterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield from rows.serialize(batch)
+                batch = []
+        yield from rows.serialize(batch)
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Create (POST) or update (PATCH, each item carrying its `id`) a list of
+        properties in one transaction. Nothing is written unless every item is
+        valid; otherwise the 400 body maps each invalid item's position in the
+        list to its errors. Images are attached per property afterwards.
+        """
+        items = request.data
+        limit = settings.PROPERTY_BULK_MAX_ITEMS
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'detail': "Expected a non-empty list of properties."})
+        if len(items) > limit:
+            raise ValidationError({'detail': f"At most {limit} properties per request."})
+        if request.method == 'POST':
+            return self.bulk_create(request, items)
+        return self.bulk_update(request, items)
+
+    def bulk_create(self, request, items):
+        serializer = PropertySerializer(
+            data=items, many=True, omit=self.bulk_omitted_fields, context=self.get_serializer_context(),
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        properties = [Property(owner=request.user, **data) for data in serializer.validated_data]
+        with transaction.atomic():
+            request.user.promote_to_owner()
+            Property.objects.bulk_create_listings(properties)
+        return Response(PropertySerializer(properties, many=True, context=self.get_serializer_context()).data,
+                        status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request, items):
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        occurrences = Counter(ids)
+        errors, properties, fields = {}, [], set()
+        with transaction.atomic():
+            # Locked (in id order, so concurrent bulk updates can't deadlock) from read to
+            # write: a PATCH to one of these rows waits rather than being overwritten.
+            owned = {
+                instance.pk: instance
+                for instance in Property.objects.active().filter(
+                    owner=request.user, pk__in=[pk for pk in ids if isinstance(pk, int)],
+                ).select_for_update().order_by('pk')
+            }
+            for index, (pk, item) in enumerate(zip(ids, items)):
+                instance = owned.get(pk)
+                if instance is None or occurrences[pk] > 1:
+                    errors[index] = {'id': ["Duplicate id." if instance else "Not found."]}
+                    continue
+                serializer = PropertySerializer(instance, data=item, partial=True, omit=self.bulk_omitted_fields,
+                                                context=self.get_serializer_context())
+                if not serializer.is_valid():
+                    errors[index] = serializer.errors
+                    continue
+                for field, value in serializer.validated_data.items():
+                    setattr(instance, field, value)
+                fields.update(serializer.validated_data)
+                properties.append(instance)
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            if fields:
+                Property.objects.bulk_update_listings(properties, fields)
+        return Response(PropertySerializer(properties, many=True, context=self.get_serializer_context()).data)
+
     def perform_create(self, serializer):
         user = self.request.user
-        
         # Auto-upgrade TENANT to OWNER upon first property creation
-        if hasattr(user, 'role') and user.role == 'TENANT':
-            user.role = 'OWNER'
-            user.save()
-            
+        user.promote_to_owner()
         # The user creating the property is assigned as the owner automatically
         serializer.save(owner=user)
 
     def perform_destroy(self, instance):
         # Override destroy to trigger soft delete instead of hard delete
         instance.delete()
+
+
+class PropertyImageUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                                 mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads for large property images.
+
+    POST {filename, size} starts an upload; each PUT appends the raw request body
+    at the byte offset given in the Upload-Offset header (409 with the current
+    state if it does not match, so the client can resume from `offset`). Once
+    complete, pass the upload's id as `image_upload` when creating or updating
+    a property. A user holds at most PROPERTY_IMAGE_MAX_OPEN_UPLOADS unexpired
+    uploads; one left unwritten for PROPERTY_IMAGE_UPLOAD_EXPIRY seconds is gone.
+    """
+    serializer_class = PropertyImageUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    chunk_size = 64 * 1024
+
+    def get_queryset(self):
+        return PropertyImageUpload.objects.unexpired().filter(owner=self.request.user)
+
+    def perform_create(self, serializer):
+        limit = settings.PROPERTY_IMAGE_MAX_OPEN_UPLOADS
+        if self.get_queryset().count() >= limit:
+            raise ValidationError({'detail': f"At most {limit} uploads may be open at once; finish or delete one."})
+        serializer.save(owner=self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.discard()
+
+    def update(self, request, *args, **kwargs):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            raise ValidationError({'Upload-Offset': "A numeric Upload-Offset header is required."})
+
+        with transaction.atomic():
+            upload = self.get_object()
+            upload = PropertyImageUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.is_complete or offset != upload.offset:
+                return Response(self.get_serializer(upload).data, status=status.HTTP_409_CONFLICT)
+            if offset + length > upload.size:
+                raise ValidationError({'detail': "Chunk runs past the declared size."})
+
+            os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+            with open(upload.path, 'r+b' if offset else 'wb') as partial:
+                partial.seek(offset)
+                remaining = length
+                while remaining:
+                    chunk = request.stream.read(min(self.chunk_size, remaining)) if request.stream else b''
+                    if not chunk:
+                        break
+                    partial.write(chunk)
+                    remaining -= len(chunk)
+                partial.truncate()
+                upload.offset = partial.tell()
+
+            complete = upload.offset == upload.size
+            if offset < HEADER_LIMIT or complete:
+                with open(upload.path, 'rb') as partial:
+                    header = partial.read(HEADER_LIMIT)
+                try:
+                    check_image_header(header, complete=complete)
+                except ValueError as error:
+                    # Returned, not raised, so the atomic block keeps the deletion.
+                    upload.discard()
+                    return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+            if complete:
+                upload.completed_at = timezone.now()
+            upload.save(update_fields=['offset', 'completed_at', 'updated_at'])
+        return Response(self.get_serializer(upload).data)
@@ -16,5 +16,11 @@ class CustomUser(AbstractUser):
         default=Role.TENANT,
     )
 
+    def promote_to_owner(self):
+        """Tenants become owners when they list their first property."""
+        if self.role == self.Role.TENANT:
+            self.role = self.Role.OWNER
+            self.save(update_fields=['role'])
+
     def __str__(self):
         return f"{self.username} ({self.role})"